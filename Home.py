@@ -1,5 +1,6 @@
 import streamlit as st
-import pandas as pd
+
+from data_access import load_dataset
 
 # -----------------------------
 # Page config
@@ -104,8 +105,8 @@ st.markdown(
 # -----------------------------
 # Load datasets
 # -----------------------------
-health_df = pd.read_csv("insurance.csv")
-car_df = pd.read_csv("Car_Dataset.csv")
+health_df = load_dataset("health")
+car_df = load_dataset("car")
 
 # -----------------------------
 # Dataset Information
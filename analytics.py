@@ -0,0 +1,290 @@
+"""Precomputed chart summaries for the analytics pages.
+
+The analytics pages used to hand every dataset row to seaborn on every
+rerun. Now the charts are drawn from fixed-size summaries computed once per
+dataset version (see ``data_access.dataset_version``):
+
+* histograms: bin edges, counts and a binned Gaussian KDE curve;
+* box plots: quartiles, 1.5 IQR whiskers and a capped sample of fliers;
+* category counts: a crosstab;
+* scatter plots: 2D-binned densities.
+
+The summaries are written as JSON to ``ANALYTICS_CACHE_DIR`` and cached in
+Streamlit, so a page's render cost no longer depends on the row count.
+
+    python analytics.py build          # precompute both datasets
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_access import dataset_version, health_analytics_frame, load_dataset
+
+ANALYTICS_CACHE_DIR = os.getenv("ANALYTICS_CACHE_DIR", os.path.join(".cache", "analytics"))
+
+# bump when the summary layout changes so stale files are not read back
+SCHEMA_VERSION = 1
+PREMIUM_ORDER = ["Low", "Medium", "High"]
+MAX_FLIERS = 200
+KDE_GRID = 200
+DENSITY_BINS = 40
+
+
+# -----------------------
+# Summaries
+# -----------------------
+def histogram(values: pd.Series, bins: int = 15) -> Dict[str, Any]:
+    """Counts as ``sns.histplot(bins=bins, kde=True)`` draws them, plus the KDE line.
+
+    The KDE smooths a fine histogram with a Gaussian of Scott's bandwidth
+    instead of summing one kernel per row.
+    """
+    v = values.dropna().to_numpy(dtype=float)
+    counts, edges = np.histogram(v, bins=bins)
+    summary = {"edges": edges.tolist(), "counts": counts.tolist(), "n": int(len(v))}
+    if len(v) < 2 or v.std() == 0:
+        return summary
+    bandwidth = v.std(ddof=1) * len(v) ** (-1 / 5)
+    fine, fine_edges = np.histogram(v, bins=KDE_GRID * 4, range=(edges[0], edges[-1]))
+    step = fine_edges[1] - fine_edges[0]
+    half = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(fine, kernel / kernel.sum(), mode="same")
+    # same scale as the bars: count per histogram bin
+    curve = density / step * (edges[1] - edges[0])
+    centers = (fine_edges[:-1] + fine_edges[1:]) / 2
+    take = np.linspace(0, len(centers) - 1, KDE_GRID).astype(int)
+    summary["kde"] = {"x": centers[take].tolist(), "y": curve[take].tolist()}
+    return summary
+
+
+def box_stats(values: pd.Series, groups: pd.Series, order: Sequence) -> List[Dict[str, Any]]:
+    """``matplotlib.axes.Axes.bxp`` input per group, in ``order``."""
+    rng = np.random.default_rng(0)
+    by_group = {
+        key: group.dropna().to_numpy(dtype=float)
+        for key, group in values.groupby(groups, observed=True)
+    }
+    boxes = []
+    for label in order:
+        v = by_group.get(label)
+        if v is None or len(v) == 0:
+            continue
+        q1, med, q3 = np.percentile(v, [25, 50, 75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = v[(v >= low) & (v <= high)]
+        fliers = v[(v < low) | (v > high)]
+        n_fliers = len(fliers)
+        if n_fliers > MAX_FLIERS:
+            fliers = rng.choice(fliers, MAX_FLIERS, replace=False)
+        boxes.append(
+            {
+                "label": str(label),
+                "n": int(len(v)),
+                "q1": float(q1),
+                "med": float(med),
+                "q3": float(q3),
+                "whislo": float(inside.min()),
+                "whishi": float(inside.max()),
+                "mean": float(v.mean()),
+                "fliers": np.sort(fliers).tolist(),
+                "n_fliers": int(n_fliers),
+            }
+        )
+    return boxes
+
+
+def counts(x: pd.Series, hue: pd.Series, order: Sequence) -> Dict[str, Any]:
+    table = pd.crosstab(x, hue).reindex(order, fill_value=0)
+    return {
+        "order": [str(o) for o in order],
+        "hue": {str(h): table[h].astype(int).tolist() for h in table.columns},
+    }
+
+
+def _edges(v: np.ndarray, bins: int) -> np.ndarray:
+    lo, hi = float(v.min()), float(v.max())
+    if np.all(v == np.round(v)) and hi - lo < bins:
+        # small integer range: one bin per value
+        return np.arange(lo - 0.5, hi + 1.5)
+    return np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+
+
+def density(x: pd.Series, y: pd.Series, bins: int = DENSITY_BINS) -> Dict[str, Any]:
+    frame = pd.DataFrame({"x": x, "y": y}).dropna()
+    xv, yv = frame["x"].to_numpy(dtype=float), frame["y"].to_numpy(dtype=float)
+    if len(xv) == 0:
+        return {"x_edges": [], "y_edges": [], "counts": [], "n": 0}
+    grid, x_edges, y_edges = np.histogram2d(xv, yv, bins=(_edges(xv, bins), _edges(yv, bins)))
+    return {
+        "x_edges": x_edges.tolist(),
+        "y_edges": y_edges.tolist(),
+        "counts": grid.astype(int).tolist(),
+        "n": int(len(xv)),
+    }
+
+
+def _preview(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return json.loads(df.head().to_json(orient="records"))
+
+
+def health_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    category = df["insurance_premium_category"]
+    return {
+        "rows": int(len(df)),
+        "preview": _preview(df),
+        "age": histogram(df["age"]),
+        "bmi_by_category": box_stats(df["bmi"], category, PREMIUM_ORDER),
+        "smoker_by_category": counts(category, df["smoker"], PREMIUM_ORDER),
+        "income_by_category": box_stats(df["income_lpa"], category, PREMIUM_ORDER),
+    }
+
+
+def car_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    premium = df["Insurance Premium"]
+    accidents = df["Previous Accidents"]
+    return {
+        "rows": int(len(df)),
+        "preview": _preview(df),
+        "premium": histogram(premium),
+        "age_vs_premium": density(df["Driver Age"], premium),
+        "experience_vs_accidents": density(df["Driver Experience"], accidents),
+        "mileage_vs_premium": density(df["Annual Mileage (x1000 km)"], premium),
+        "premium_by_accidents": box_stats(premium, accidents, sorted(accidents.dropna().unique())),
+    }
+
+
+BUILDERS = {
+    "health": lambda: health_aggregates(health_analytics_frame()),
+    "car": lambda: car_aggregates(load_dataset("car")),
+}
+
+
+# -----------------------
+# Persistence
+# -----------------------
+def aggregates_path(name: str, version: str) -> str:
+    return os.path.join(ANALYTICS_CACHE_DIR, f"{name}-{version}-v{SCHEMA_VERSION}.json")
+
+
+def build(name: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """Compute and persist the summaries for the current file version."""
+    version = version or dataset_version(name)
+    summary = {"dataset": name, "version": version, **BUILDERS[name]()}
+    os.makedirs(ANALYTICS_CACHE_DIR, exist_ok=True)
+    path = aggregates_path(name, version)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp, path)
+    for old in os.listdir(ANALYTICS_CACHE_DIR):
+        if old.startswith(f"{name}-") and old.endswith(".json") and old != os.path.basename(path):
+            try:
+                os.remove(os.path.join(ANALYTICS_CACHE_DIR, old))
+            except OSError:
+                pass
+    return summary
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _aggregates(name: str, version: str) -> Dict[str, Any]:
+    path = aggregates_path(name, version)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return build(name, version)
+
+
+def load_aggregates(name: str) -> Dict[str, Any]:
+    """Summaries for the dataset as it is on disk now; built on first use."""
+    return _aggregates(name, dataset_version(name))
+
+
+# -----------------------
+# Drawing
+# -----------------------
+def plot_histogram(ax, summary: Dict[str, Any], color: str) -> None:
+    edges = np.asarray(summary["edges"])
+    ax.bar(
+        edges[:-1],
+        summary["counts"],
+        width=np.diff(edges),
+        align="edge",
+        color=color,
+        alpha=0.75,
+        edgecolor="#0e1117",
+    )
+    if "kde" in summary:
+        ax.plot(summary["kde"]["x"], summary["kde"]["y"], color=color, linewidth=1.5)
+
+
+def plot_boxes(ax, boxes: List[Dict[str, Any]], palette) -> None:
+    import seaborn as sns
+
+    colors = sns.color_palette(palette, len(boxes))
+    line = {"color": "#9ca3af"}
+    artists = ax.bxp(
+        boxes,
+        widths=0.8,
+        patch_artist=True,
+        showfliers=True,
+        boxprops={"edgecolor": line["color"]},
+        whiskerprops=line,
+        capprops=line,
+        medianprops=line,
+        flierprops={"markeredgecolor": line["color"]},
+    )
+    for patch, color in zip(artists["boxes"], colors):
+        patch.set_facecolor(color)
+
+
+def plot_counts(ax, summary: Dict[str, Any], colors: Sequence[str], title: str) -> None:
+    order, hue = summary["order"], summary["hue"]
+    width = 0.8 / max(len(hue), 1)
+    x = np.arange(len(order))
+    for i, ((label, values), color) in enumerate(zip(hue.items(), colors)):
+        ax.bar(x - 0.4 + width * (i + 0.5), values, width=width, color=color, label=label)
+    ax.set_xticks(x, order)
+    ax.legend(title=title)
+
+
+def plot_density(ax, summary: Dict[str, Any], color: str) -> None:
+    from matplotlib.colors import LinearSegmentedColormap, to_rgba
+
+    if not summary["n"]:
+        return
+    grid = np.ma.masked_equal(np.asarray(summary["counts"]).T, 0)
+    # empty cells stay transparent; sparse ones are a faint version of ``color``
+    cmap = LinearSegmentedColormap.from_list(
+        "density", [to_rgba(color, 0.3), to_rgba(color, 1.0)]
+    )
+    mesh = ax.pcolormesh(summary["x_edges"], summary["y_edges"], grid, cmap=cmap)
+    ax.figure.colorbar(mesh, ax=ax, label="Count")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute analytics summaries")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="compute and persist the summaries")
+    build_cmd.add_argument("names", nargs="*", help=f"{', '.join(sorted(BUILDERS))} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BUILDERS)
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+
+    for name in args.names or sorted(BUILDERS):
+        summary = build(name)
+        print(f"{name}: {summary['rows']} rows -> {aggregates_path(name, summary['version'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
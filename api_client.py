@@ -0,0 +1,165 @@
+"""Shared HTTP client for the Streamlit predictor pages.
+
+One pooled ``requests.Session`` per Streamlit server (``get_client`` is a
+``st.cache_resource``). It keeps connections alive between submits and
+retries connection errors and 502/503 answers with backoff. A 503's
+``Retry-After`` header is honoured. A 504 is not retried: the server may
+still be scoring the first attempt. Identical payloads can be answered from
+a small TTL cache, off by default because a cached answer outlives a model
+swap. Every call records its client-side latency.
+
+    from api_client import get_client, show_latency
+    result = get_client().post("/car/predict", payload)
+    result.status_code, result.data, result.latency_ms, result.cached
+    show_latency(get_client(), result, "/car/predict")
+
+Configuration (environment): ``API_BASE_URL``, ``API_CONNECT_TIMEOUT``,
+``API_TIMEOUT``, ``API_RETRIES``, ``API_CACHE_SIZE`` and ``API_CACHE_TTL``.
+The ``ApiClient`` class works without Streamlit, for scripted load tests.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "8"))
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))
+# identical payloads within the TTL are answered locally; size 0 disables.
+# Off by default: cached answers still come from the old model after a swap.
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "0"))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "60"))
+
+# latencies kept per path for the percentile summary
+LATENCY_WINDOW = 500
+
+
+class ApiResult(NamedTuple):
+    status_code: int
+    data: Any  # parsed JSON body, None if the body is not JSON
+    text: str
+    latency_ms: float
+    cached: bool
+
+
+class ApiClient:
+    def __init__(
+        self,
+        base_url: str = API_BASE_URL,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        timeout: float = API_TIMEOUT,
+        retries: int = API_RETRIES,
+        cache_size: int = API_CACHE_SIZE,
+        cache_ttl: float = API_CACHE_TTL,
+        pool_size: int = 10,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout: Tuple[float, float] = (connect_timeout, timeout)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # a read timeout may mean the server is still scoring
+            status=retries,
+            backoff_factor=0.2,
+            # the request never reached a model; a 504 may still be scoring
+            status_forcelist=(502, 503),
+            # prediction POSTs are idempotent
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, ApiResult]]" = OrderedDict()
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _cache_get(self, key) -> Optional[ApiResult]:
+        if self.cache_size <= 0:
+            return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if self.cache_ttl and time.monotonic() > expires:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key, result: ApiResult) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _record(self, path: str, latency_ms: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(latency_ms)
+
+    def post(self, path: str, payload: Any, use_cache: bool = True) -> ApiResult:
+        """POST ``payload`` as JSON; connection errors and timeouts propagate
+        as the usual ``requests.exceptions`` once retries are exhausted."""
+        key = (path, json.dumps(payload, sort_keys=True))
+        start = time.perf_counter()
+        if use_cache:
+            hit = self._cache_get(key)
+            if hit is not None:
+                latency_ms = (time.perf_counter() - start) * 1000
+                return hit._replace(latency_ms=latency_ms, cached=True)
+        response = self.session.post(self.base_url + path, json=payload, timeout=self.timeout)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._record(path, latency_ms)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        result = ApiResult(response.status_code, data, response.text, latency_ms, False)
+        if use_cache and response.status_code == 200:
+            self._cache_put(key, result)
+        return result
+
+    def latency_stats(self, path: str) -> Optional[Dict[str, float]]:
+        """p50/p95 of the last network calls to ``path`` (cache hits excluded)."""
+        with self._lock:
+            samples = list(self._latencies.get(path, ()))
+        if not samples:
+            return None
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {"count": len(samples), "p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+@st.cache_resource(show_spinner=False)
+def get_client() -> ApiClient:
+    """The process-wide client, shared by every page and session."""
+    return ApiClient()
+
+
+def show_latency(client: ApiClient, result: ApiResult, path: str) -> None:
+    """Caption with this call's latency and the recent p50/p95 for ``path``."""
+    text = f"⏱ {result.latency_ms:.0f} ms" + (" (cached)" if result.cached else "")
+    stats = client.latency_stats(path)
+    if stats:
+        text += (
+            f" · p50 {stats['p50_ms']:.0f} ms / p95 {stats['p95_ms']:.0f} ms"
+            f" over the last {stats['count']} calls"
+        )
+    st.caption(text)
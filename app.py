@@ -1,12 +1,34 @@
+import asyncio
+import hmac
 import logging
+import math
 import os
-import joblib
-from typing import Literal, Annotated, Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, computed_field
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Literal, Annotated, Optional, Union
+
+import numpy as np
 import pandas as pd
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, StrictBool, ValidationError, computed_field
+
+import columnar
+import features
+import metrics
+import profiler
+from car_lookup import LOOKUP_DIR, CarLookupTable
+from inference import CAR_COLUMNS, ENGINES
+from inference_executor import ExecutorSaturated, InferenceExecutor
+from micro_batcher import MicroBatcher
+from model_store import LoadedModel, ModelStore
+from prediction_cache import PredictionCache, parse_quantize
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -28,11 +50,239 @@ app.add_middleware(
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
 )
+# stamps arrival time so endpoints can report parsing/validation time
+app.add_middleware(metrics.ReceivedAtMiddleware)
 
-models = {"health": None, "car": None}
-models_loaded = {"health": False, "car": False}
 sklearn_version: Optional[str] = None
 
+# encode requests with the compiled NumPy encoder instead of pandas + sklearn
+FAST_ENCODER = os.getenv("FAST_ENCODER", "1") != "0"
+
+# memory-map the cached flat forest arrays so workers share those pages
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") != "0"
+
+# load each model on its first request instead of in the startup hook
+MODEL_LAZY_LOAD = os.getenv("MODEL_LAZY_LOAD", "0") == "1"
+
+# final estimator: "sklearn", "flat" (array-based forest) or "auto" by batch size
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "auto")
+if INFERENCE_ENGINE not in ENGINES:
+    raise ValueError(f"INFERENCE_ENGINE must be one of {ENGINES}")
+
+EngineParam = Optional[Literal["sklearn", "flat", "auto"]]
+
+# shared secret for /admin endpoints (sent as X-Admin-Token); unset = admin
+# endpoints are disabled unless ADMIN_INSECURE=1 explicitly opens them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ADMIN_INSECURE = os.getenv("ADMIN_INSECURE", "0") == "1"
+
+ModelName = Literal["health", "car"]
+
+# upper bound on rows accepted by the batch endpoints
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# upper bound on rows accepted by the columnar (binary) endpoints
+COLUMNAR_MAX_ROWS = int(os.getenv("COLUMNAR_MAX_ROWS", "1000000"))
+
+# upper bound on grid points scored by one what-if sweep
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "2500"))
+
+# fraction of car requests whose raw payload is logged (at DEBUG level only)
+PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv("PAYLOAD_LOG_SAMPLE_RATE", "0.01"))
+
+# cProfile capture of prediction requests (see profiler.py); off by default,
+# switch on with PROFILE_SAMPLE_RATE or POST /admin/profiling
+request_profiler = profiler.RequestProfiler(
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "50")),
+)
+
+store_config = {
+    "paths": {
+        "health": "models/health_insurance_model.pkl",
+        "car": "models/car_insurance_model.pkl",
+    },
+    "mmap": MODEL_MMAP,
+    "fast_encoder": FAST_ENCODER,
+}
+store = ModelStore(**store_config)
+
+# dedicated pool for model scoring; "process" workers preload their own models
+executor = InferenceExecutor(
+    kind=os.getenv("INFERENCE_EXECUTOR", "thread"),
+    max_workers=int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("INFERENCE_QUEUE_SIZE", "64")),
+    timeout=float(os.getenv("INFERENCE_TIMEOUT", "10")) or None,
+    retry_after=float(os.getenv("INFERENCE_RETRY_AFTER", "1")),
+    store_config=store_config,
+)
+
+# opt-in: coalesce concurrent single-record predictions into one pipeline call
+batcher: Optional[MicroBatcher] = None
+if os.getenv("MICRO_BATCH", "0") == "1":
+    batcher = MicroBatcher(
+        executor,
+        max_batch_size=int(os.getenv("MICRO_BATCH_MAX_SIZE", "32")),
+        max_wait_ms=float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2")),
+    )
+
+# LRU/TTL cache of single-record predictions; size 0 disables it
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")) or None,
+    quantize=parse_quantize(os.getenv("PREDICTION_CACHE_QUANTIZE", "")),
+)
+store.listeners.append(lambda name, loaded: prediction_cache.invalidate(name))
+
+
+def refresh_workers(name: str, loaded: LoadedModel) -> None:
+    # process workers reload and warm the served versions before taking requests
+    executor.refresh(
+        {other: store.get(other).version for other in store.paths if store.is_loaded(other)}
+    )
+
+
+store.listeners.append(refresh_workers)
+
+# precomputed car grid (see car_lookup.py); used only while it matches the
+# sha256 of the car model being served
+CAR_LOOKUP_DIR = os.getenv("CAR_LOOKUP_DIR", LOOKUP_DIR)
+car_table: Optional[CarLookupTable] = None
+
+
+def load_car_table():
+    global car_table
+    car_table = None
+    if not CAR_LOOKUP_DIR or not os.path.exists(os.path.join(CAR_LOOKUP_DIR, "meta.json")):
+        return
+    try:
+        car_table = CarLookupTable.load(CAR_LOOKUP_DIR)
+        logger.info(
+            "Loaded car lookup table (%d cells) from %s",
+            car_table.meta["cells"],
+            CAR_LOOKUP_DIR,
+        )
+    except Exception as e:
+        logger.exception("Failed to load car lookup table: %s", e)
+
+
+def car_table_for(loaded: LoadedModel) -> Optional[CarLookupTable]:
+    table = car_table
+    if table is not None and table.fingerprint == loaded.info.get("sha256"):
+        return table
+    return None
+
+
+# -----------------------
+# Metrics
+# -----------------------
+registry = metrics.Registry()
+REQUESTS = registry.counter(
+    "insurance_requests_total",
+    "Prediction requests by model, endpoint and outcome",
+    ("model", "endpoint", "outcome"),
+)
+PREDICTIONS = registry.counter(
+    "insurance_predictions_total",
+    "Predicted rows by model and premium category",
+    ("model", "category"),
+)
+STAGE_SECONDS = registry.histogram(
+    "insurance_stage_seconds",
+    "Seconds spent per request stage "
+    "(validation, features, queue, preprocess, inference, serialization)",
+    ("model", "stage"),
+)
+IN_FLIGHT = registry.gauge(
+    "insurance_requests_in_flight",
+    "Prediction requests currently being served",
+    ("model",),
+)
+
+# HTTP status -> outcome label; anything else raised is an "error"
+OUTCOMES = {400: "invalid", 413: "invalid", 422: "invalid", 503: "rejected", 504: "timeout"}
+
+
+@registry.collector
+def service_metrics():
+    loads = [
+        ({"model": name, "version": store.get(name).version}, store.get(name).load_seconds)
+        for name in store.paths
+        if store.is_loaded(name)
+    ]
+    yield "insurance_model_load_seconds", "gauge", "Load time of the served model version", loads
+    yield "insurance_executor_pending", "gauge", "Scoring jobs admitted to the executor", [
+        ({"kind": executor.kind}, executor.pending)
+    ]
+    yield "insurance_executor_rejected_total", "counter", "Scoring jobs rejected as saturated", [
+        ({"kind": executor.kind}, executor.rejected)
+    ]
+    yield "insurance_executor_timeouts_total", "counter", "Scoring jobs that timed out", [
+        ({"kind": executor.kind}, executor.timeouts)
+    ]
+    yield "insurance_prediction_cache_lookups_total", "counter", "Prediction cache lookups", [
+        ({"result": "hit"}, prediction_cache.hits),
+        ({"result": "miss"}, prediction_cache.misses),
+    ]
+
+
+class RequestTrace:
+    """Stage timings and predicted categories collected for one request."""
+
+    def __init__(self, model: str, request: Request):
+        self.model = model
+        self.timings: Dict[str, float] = {}
+        self.categories: Counter = Counter()
+        # raw cProfile stats from the scoring workers; a list only when profiled
+        self.profiles: Optional[List[Dict[Any, Any]]] = None
+        received = request.scope.get("received_at")
+        if received is not None:
+            self.timings["validation"] = time.perf_counter() - received
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def track(model: str, request: Request):
+    """Count the request, its outcome and categories, and observe its stages."""
+    trace = RequestTrace(model, request)
+    profile = request_profiler.begin() if request_profiler.active else None
+    if profile is not None:
+        trace.profiles = []
+    outcome = "error"
+    IN_FLIGHT.inc((model,))
+    try:
+        yield trace
+        outcome = "ok"
+    except HTTPException as e:
+        outcome = OUTCOMES.get(e.status_code, "error")
+        raise
+    finally:
+        if profile is not None:
+            label = request.url.path.strip("/").replace("/", "-")
+            request_profiler.finish(profile, label, trace.profiles)
+        IN_FLIGHT.dec((model,))
+        REQUESTS.inc((model, request.url.path, outcome))
+        for category, count in trace.categories.items():
+            PREDICTIONS.inc((model, category), count)
+        for stage, seconds in trace.timings.items():
+            STAGE_SECONDS.observe((model, stage), seconds)
+
+
+@app.exception_handler(RequestValidationError)
+async def count_invalid_request(request: Request, exc: RequestValidationError):
+    model = request.url.path.strip("/").split("/")[0]
+    if model in store.paths:
+        REQUESTS.inc((model, request.url.path, "invalid"))
+    return await request_validation_exception_handler(request, exc)
+
 
 # Model Loading
 @app.on_event("startup")
@@ -46,37 +296,49 @@ def load_models():
     except Exception:
         sklearn_version = None
 
-    # health model (optional)
-    health_path = "models/health_insurance_model.pkl"
-    if os.path.exists(health_path):
-        try:
-            models["health"] = joblib.load(health_path)
-            models_loaded["health"] = True
-            logger.info("Loaded health model from %s", health_path)
-        except Exception as e:
-            models["health"] = None
-            models_loaded["health"] = False
-            logger.exception("Failed to load health model: %s", e)
-    else:
-        logger.warning("Health model not found at %s", health_path)
+    if not ADMIN_TOKEN:
+        if ADMIN_INSECURE:
+            logger.warning("ADMIN_INSECURE=1: /admin endpoints are open without a token")
+        else:
+            logger.info("/admin endpoints are disabled; set ADMIN_TOKEN to enable them")
 
-    # car model
-    car_path = "models/car_insurance_model.pkl"
-    if os.path.exists(car_path):
-        try:
-            models["car"] = joblib.load(car_path)
-            models_loaded["car"] = True
-            logger.info("Loaded car model from %s", car_path)
-        except Exception as e:
-            models["car"] = None
-            models_loaded["car"] = False
-            logger.exception("Failed to load car model: %s", e)
-    else:
-        logger.warning("Car model not found at %s", car_path)
+    load_car_table()
+    executor.start()
+    if MODEL_LAZY_LOAD:
+        logger.info("Lazy model loading enabled; models load on first request")
+        return
+    store.load_all()
+
+
+@app.on_event("shutdown")
+def stop_executor():
+    executor.shutdown()
+
+
+def get_model(name) -> LoadedModel:
+    loaded = store.get(name)
+    if loaded is None:
+        raise HTTPException(
+            status_code=503, detail=f"{name.capitalize()} model not loaded"
+        )
+    return loaded
 
 
-tier_1 = [...]
-tier_2 = [...]
+async def load_model(name) -> LoadedModel:
+    # lazy loads read the artifact from disk; keep that off the event loop
+    if store.is_loaded(name):
+        return get_model(name)
+    return await run_in_threadpool(get_model, name)
+
+
+def executor_error(e: Exception) -> HTTPException:
+    if isinstance(e, ExecutorSaturated):
+        return HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    return HTTPException(status_code=504, detail="Prediction timed out")
 
 
 class HealthUserInput(BaseModel):
@@ -103,39 +365,23 @@ class HealthUserInput(BaseModel):
     @computed_field
     @property
     def bmi(self) -> float:
-        return self.weight / ((self.height * 0.3048) ** 2)
+        # height is collected in feet
+        return float(features.bmi(self.weight, self.height, height_unit="ft"))
 
     @computed_field
     @property
     def lifestyle_risk(self) -> str:
-        if self.smoker and self.bmi > 30:
-            return "high"
-        elif self.smoker and self.bmi > 27:
-            return "medium"
-        else:
-            return "low"
+        return str(features.lifestyle_risk(self.smoker, self.bmi))
 
     @computed_field
     @property
     def age_group(self) -> str:
-        if self.age < 25:
-            return "Young"
-        elif self.age < 45:
-            return "Adult"
-        elif self.age < 60:
-            return "Middle_Aged"
-        else:
-            return "Senior"
+        return str(features.age_group(self.age))
 
     @computed_field
     @property
     def city_tier(self) -> int:
-        if self.city in tier_1:
-            return 1
-        elif self.city in tier_2:
-            return 2
-        else:
-            return 3
+        return int(features.city_tier(self.city))
 
 
 # CAR input:
@@ -149,91 +395,586 @@ class CarUserInput(BaseModel):
     car_age: Annotated[int, Field(..., ge=0)]
 
 
+# model input rows
+def health_features(data: HealthUserInput) -> Dict[str, Any]:
+    return {
+        "bmi": data.bmi,
+        "age_group": data.age_group,
+        "lifestyle_risk": data.lifestyle_risk,
+        "city_tier": data.city_tier,
+        "income_lpa": data.income_lpa,
+        "occupation": data.occupation,
+    }
+
+
+def health_feature_rows(items: List[HealthUserInput]) -> List[Dict[str, Any]]:
+    """``health_features`` for a whole batch through the vectorized module."""
+    computed = set(HealthUserInput.model_computed_fields)
+    raw = pd.DataFrame([item.model_dump(exclude=computed) for item in items])
+    return features.health_features(raw, height_unit="ft").to_dict("records")
+
+
+def car_features(data: CarUserInput) -> Dict[str, Any]:
+    raw = data.model_dump()
+    return {column: raw[field] for field, column in CAR_COLUMNS.items()}
+
+
+def pick_engine(loaded: LoadedModel, engine):
+    engine = engine or INFERENCE_ENGINE
+    if engine == "flat" and loaded.forest is None:
+        raise HTTPException(
+            status_code=400, detail=f"Flat engine not available for {loaded.name} model"
+        )
+    return engine
+
+
+async def predict_one(
+    loaded: LoadedModel,
+    features: Dict[str, Any],
+    engine: str,
+    timings: Optional[Dict[str, float]] = None,
+    profiles: Optional[List[Dict[Any, Any]]] = None,
+):
+    """Single-record prediction through the cache; returns (label, confidence)."""
+    key = None
+    if prediction_cache.enabled:
+        # the artifact hash, not the version: legacy reloads keep "legacy"
+        key = prediction_cache.key(loaded.name, loaded.info["sha256"], features)
+        hit = prediction_cache.get(key)
+        if hit is not None:
+            return hit
+    if batcher is not None and profiles is None:
+        label, prob = await batcher.score(loaded, features, engine, timings)
+    else:
+        # profiled requests skip the micro-batcher so the profile is theirs alone
+        labels, probs = await executor.score(loaded, [features], engine, timings, profiles)
+        label, prob = labels[0], probs[0]
+    result = (str(label), float(prob))
+    if key is not None:
+        prediction_cache.put(key, result)
+    return result
+
+
+def validate_batch(schema, records: List[Dict[str, Any]]):
+    """Validate every record on its own so one bad row does not fail the batch."""
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({len(records)} > {MAX_BATCH_SIZE} rows)",
+        )
+    valid, errors = [], {}
+    for i, record in enumerate(records):
+        try:
+            valid.append((i, schema.model_validate(record)))
+        except ValidationError as e:
+            errors[i] = e.errors(include_url=False, include_context=False)
+    return valid, errors
+
+
+def batch_response(insurance_type, n_rows, indices, labels, probs, errors):
+    results: List[Optional[Dict[str, Any]]] = [None] * n_rows
+    for i, label, prob in zip(indices, labels, probs):
+        results[i] = {
+            "index": i,
+            "predicted_category": str(label),
+            "confidence": round(float(prob), 3),
+        }
+    for i, err in errors.items():
+        results[i] = {"index": i, "error": err}
+    return JSONResponse(
+        content={
+            "insurance_type": insurance_type,
+            "count": n_rows,
+            "failed": len(errors),
+            "predictions": results,
+        }
+    )
+
+
 # Health check endpoint
 @app.get("/health")
 def health():
     return {
-        "models_loaded": {k: v for k, v in models_loaded.items()},
+        "models_loaded": {name: store.is_loaded(name) for name in store.paths},
         "sklearn_version": sklearn_version,
+        **store.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "executor": executor.stats(),
+        "city_tiers": features.city_tiers().stats(),
+        "profiling": request_profiler.stats(),
+        "micro_batch": batcher.stats() if batcher is not None else {"enabled": False},
+        "car_lookup": (
+            {
+                "cells": car_table.meta["cells"],
+                "serving": store.is_loaded("car")
+                and car_table_for(store.get("car")) is not None,
+            }
+            if car_table is not None
+            else None
+        ),
     }
 
 
 # Health predict
 @app.post("/health/predict")
-def predict_health(data: HealthUserInput):
-    if not models_loaded["health"] or models["health"] is None:
-        raise HTTPException(status_code=503, detail="Health model not loaded")
-
-    input_df = pd.DataFrame(
-        [
-            {
-                "bmi": data.bmi,
-                "age_group": data.age_group,
-                "lifestyle_risk": data.lifestyle_risk,
-                "city_tier": data.city_tier,
-                "income_lpa": data.income_lpa,
-                "occupation": data.occupation,
-            }
-        ]
-    )
+async def predict_health(
+    request: Request, data: HealthUserInput, engine: EngineParam = None
+):
+    with track("health", request) as trace:
+        loaded = await load_model("health")
+        engine = pick_engine(loaded, engine)
 
-    try:
-        model = models["health"]
-        pred = model.predict(input_df)[0]
-        prob = None
         try:
-            prob = float(model.predict_proba(input_df).max())
-        except Exception:
-            prob = None
-    except Exception as e:
-        logger.exception("Health prediction error: %s", e)
-        raise HTTPException(status_code=500, detail="Prediction failed")
+            with trace.stage("features"):
+                row = health_features(data)
+            pred, prob = await predict_one(
+                loaded, row, engine, trace.timings, trace.profiles
+            )
+        except (ExecutorSaturated, asyncio.TimeoutError) as e:
+            raise executor_error(e)
+        except Exception as e:
+            logger.exception("Health prediction error: %s", e)
+            raise HTTPException(status_code=500, detail="Prediction failed")
 
-    return JSONResponse(
-        content={
-            "insurance_type": "health",
-            "predicted_category": str(pred),
-            "confidence": round(prob, 3) if prob is not None else None,
-        }
-    )
+        trace.categories[str(pred)] += 1
+        with trace.stage("serialization"):
+            return JSONResponse(
+                content={
+                    "insurance_type": "health",
+                    "predicted_category": str(pred),
+                    "confidence": round(prob, 3),
+                }
+            )
 
 
 # Car predict
 @app.post("/car/predict")
-def predict_car(data: CarUserInput):
-    if not models_loaded["car"] or models["car"] is None:
-        raise HTTPException(status_code=503, detail="Car model not loaded")
+async def predict_car(request: Request, data: CarUserInput, engine: EngineParam = None):
+    with track("car", request) as trace:
+        loaded = await load_model("car")
+        engine = pick_engine(loaded, engine)
+
+        raw = data.model_dump()
+        if (
+            PAYLOAD_LOG_SAMPLE_RATE > 0
+            and logger.isEnabledFor(logging.DEBUG)
+            and random.random() < PAYLOAD_LOG_SAMPLE_RATE
+        ):
+            logger.debug("Car raw payload: %s", raw)
 
-    raw = data.model_dump()
-    logger.info("Car raw payload: %s", raw)
-    mapped = {
-        "Driver Age": raw["driver_age"],
-        "Driver Experience": raw["driver_experience"],
-        "Previous Accidents": raw["previous_accidents"],
-        "Annual Mileage (x1000 km)": raw["annual_mileage_x1000"],
-        "Car Manufacturing Year": raw["car_manufacturing_year"],
-        "Car Age": raw["car_age"],
-    }
+        try:
+            table = car_table_for(loaded)
+            with trace.stage("lookup"):
+                hit = table.lookup(raw) if table is not None else None
+            if hit is not None:
+                pred, prob = hit
+            else:
+                with trace.stage("features"):
+                    row = car_features(data)
+                pred, prob = await predict_one(
+                    loaded, row, engine, trace.timings, trace.profiles
+                )
+        except (ExecutorSaturated, asyncio.TimeoutError) as e:
+            raise executor_error(e)
+        except Exception as e:
+            logger.exception("Car prediction error: %s", e)
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+        trace.categories[str(pred)] += 1
+        with trace.stage("serialization"):
+            return JSONResponse(
+                content={
+                    "insurance_type": "car",
+                    "predicted_category": str(pred),
+                    "confidence": round(prob, 3),
+                }
+            )
+
+
+# Batch predict: one DataFrame and a single predict_proba call per request
+@app.post("/health/predict/batch")
+async def predict_health_batch(
+    request: Request, records: List[Dict[str, Any]], engine: EngineParam = None
+):
+    with track("health", request) as trace:
+        loaded = await load_model("health")
+        engine = pick_engine(loaded, engine)
+
+        with trace.stage("validation"):
+            valid, errors = await run_in_threadpool(validate_batch, HealthUserInput, records)
+        indices = [i for i, _ in valid]
+        labels, probs = [], []
+        if valid:
+            with trace.stage("features"):
+                rows = health_feature_rows([data for _, data in valid])
+            try:
+                labels, probs = await executor.score(
+                    loaded, rows, engine, trace.timings, trace.profiles
+                )
+            except (ExecutorSaturated, asyncio.TimeoutError) as e:
+                raise executor_error(e)
+            except Exception as e:
+                logger.exception("Health batch prediction error: %s", e)
+                raise HTTPException(status_code=500, detail="Prediction failed")
+
+        trace.categories.update(str(label) for label in labels)
+        with trace.stage("serialization"):
+            return batch_response("health", len(records), indices, labels, probs, errors)
+
+
+@app.post("/car/predict/batch")
+async def predict_car_batch(
+    request: Request, records: List[Dict[str, Any]], engine: EngineParam = None
+):
+    with track("car", request) as trace:
+        loaded = await load_model("car")
+        engine = pick_engine(loaded, engine)
+
+        with trace.stage("validation"):
+            valid, errors = await run_in_threadpool(validate_batch, CarUserInput, records)
+        indices = [i for i, _ in valid]
+        labels, probs = [], []
+        if valid:
+            with trace.stage("features"):
+                rows = [car_features(data) for _, data in valid]
+            try:
+                labels, probs = await executor.score(
+                    loaded, rows, engine, trace.timings, trace.profiles
+                )
+            except (ExecutorSaturated, asyncio.TimeoutError) as e:
+                raise executor_error(e)
+            except Exception as e:
+                logger.exception("Car batch prediction error: %s", e)
+                raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+        trace.categories.update(str(label) for label in labels)
+        with trace.stage("serialization"):
+            return batch_response("car", len(records), indices, labels, probs, errors)
+
+
+# Columnar predict: binary struct-of-arrays bodies, validated column-wise
+COLUMN_RULES = {
+    "health": columnar.column_rules(HealthUserInput),
+    "car": columnar.column_rules(CarUserInput),
+}
+
+
+def columnar_frame(name: str, columns: Dict[str, np.ndarray], valid: np.ndarray) -> pd.DataFrame:
+    if name == "health":
+        raw = pd.DataFrame({field: values[valid] for field, values in columns.items()})
+        return features.health_features(raw, height_unit="ft")
+    return pd.DataFrame(
+        {column: columns[field][valid].astype(float) for field, column in CAR_COLUMNS.items()}
+    )
 
-    input_df = pd.DataFrame([mapped])
-    logger.info("Prepared input_df columns: %s", list(input_df.columns))
 
+def read_columnar(name: str, body: bytes, content_type: str):
+    """(typed columns, per-row errors) for a columnar body."""
     try:
-        model = models["car"]
-        pred = model.predict(input_df)[0]
-        prob = None
-        try:
-            prob = float(model.predict_proba(input_df).max())
-        except Exception:
-            prob = None
+        columns = columnar.read_columns(body, content_type)
+        n_rows = max((len(values) for values in columns.values()), default=0)
+        if n_rows > COLUMNAR_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large ({n_rows} > {COLUMNAR_MAX_ROWS} rows)",
+            )
+        return columnar.validate_columns(COLUMN_RULES[name], columns)
+    except columnar.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except columnar.ColumnarError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def predict_columnar(name: str, request: Request, engine) -> Response:
+    with track(name, request) as trace:
+        loaded = await load_model(name)
+        engine = pick_engine(loaded, engine)
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        accept = columnar.response_type(request.headers.get("accept"), content_type)
+
+        body = await request.body()
+        with trace.stage("validation"):
+            columns, errors = await run_in_threadpool(read_columnar, name, body, content_type)
+        valid = errors == ""
+        n_rows = len(errors)
+        categories = np.full(n_rows, "", dtype=object)
+        confidence = np.full(n_rows, np.nan)
+        if valid.any():
+            with trace.stage("features"):
+                frame = await run_in_threadpool(columnar_frame, name, columns, valid)
+            try:
+                labels, probs = await executor.score(
+                    loaded, frame, engine, trace.timings, trace.profiles
+                )
+            except (ExecutorSaturated, asyncio.TimeoutError) as e:
+                raise executor_error(e)
+            except Exception as e:
+                logger.exception("%s columnar prediction error: %s", name.capitalize(), e)
+                raise HTTPException(status_code=500, detail="Prediction failed")
+            categories[valid] = labels
+            confidence[valid] = probs
+            values, counts = np.unique(np.asarray(labels, dtype=str), return_counts=True)
+            trace.categories.update(dict(zip(values.tolist(), counts.tolist())))
+
+        with trace.stage("serialization"):
+            payload = columnar.write_columns(
+                {
+                    "predicted_category": categories,
+                    "confidence": confidence,
+                    "error": errors,
+                },
+                accept,
+            )
+            return Response(
+                payload,
+                media_type=accept,
+                headers={"X-Rows": str(n_rows), "X-Failed-Rows": str(int((~valid).sum()))},
+            )
+
+
+@app.post("/health/predict/columnar")
+async def predict_health_columnar(request: Request, engine: EngineParam = None):
+    """Body: NumPy ``.npy`` structured array, ``.npz`` or Arrow IPC stream with one
+    column per ``HealthUserInput`` field. Response: ``predicted_category``,
+    ``confidence`` and ``error`` columns in the ``Accept`` (default: request) format."""
+    return await predict_columnar("health", request, engine)
+
+
+@app.post("/car/predict/columnar")
+async def predict_car_columnar(request: Request, engine: EngineParam = None):
+    """Columnar ``/car/predict/batch``; see ``/health/predict/columnar``."""
+    return await predict_columnar("car", request, engine)
+
+
+# What-if sweeps: one base record with one or two fields varied over a grid
+class SweepAxis(BaseModel):
+    field: str
+    # explicit values, or a numeric range of ``steps`` points from start to stop;
+    # bool and Literal fields default to all their values, city to one per tier
+    # scalars only: a nested list would build a grid of another shape
+    values: Annotated[
+        Optional[List[Union[StrictBool, int, float, str, None]]], Field(min_length=1)
+    ] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Annotated[int, Field(ge=2, le=1000)] = 11
+
+
+class HealthSweepRequest(BaseModel):
+    base: HealthUserInput
+    vary: Annotated[List[SweepAxis], Field(min_length=1, max_length=2)]
+
+
+class CarSweepRequest(BaseModel):
+    base: CarUserInput
+    vary: Annotated[List[SweepAxis], Field(min_length=1, max_length=2)]
+
+
+def sweep_values(
+    rule: columnar.ColumnRule, axis: SweepAxis, base: Dict[str, Any]
+) -> np.ndarray:
+    if axis.values is not None:
+        return np.asarray(axis.values)
+    if rule.kind in ("int", "float"):
+        if axis.start is None or axis.stop is None:
+            raise HTTPException(
+                status_code=422, detail=f"{axis.field}: give values or start and stop"
+            )
+        values = np.linspace(axis.start, axis.stop, axis.steps)
+        return pd.unique(np.round(values)).astype(np.int64) if rule.kind == "int" else values
+    if rule.kind == "bool":
+        return np.array([False, True])
+    if rule.choices is not None:
+        return np.asarray(rule.choices)
+    if rule.name == "city":
+        # only the tier reaches the model: one city per tier, the base city for its own
+        return np.asarray(list(features.city_tiers().representatives(base.get("city")).values()))
+    raise HTTPException(status_code=422, detail=f"{axis.field}: give the values to sweep")
+
+
+def sweep_grid(name: str, base: Dict[str, Any], vary: List[SweepAxis]):
+    """(axis values, one column per input field) for the full grid, row-major."""
+    rules = {rule.name: rule for rule in COLUMN_RULES[name]}
+    fields = [axis.field for axis in vary]
+    unknown = [field for field in fields if field not in rules]
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown sweep field(s): {', '.join(unknown)}"
+        )
+    if len(set(fields)) != len(fields):
+        raise HTTPException(status_code=422, detail="Sweep fields must differ")
+    axes = [sweep_values(rules[axis.field], axis, base) for axis in vary]
+    size = math.prod(len(values) for values in axes)
+    if size > SWEEP_MAX_POINTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Sweep too large ({size} > {SWEEP_MAX_POINTS} points)",
+        )
+    columns = {field: np.full(size, value) for field, value in base.items()}
+    for field, grid in zip(fields, np.meshgrid(*axes, indexing="ij")):
+        columns[field] = grid.ravel()
+    return axes, columns
+
+
+async def predict_sweep(
+    name: str, request: Request, base: BaseModel, vary: List[SweepAxis], engine
+) -> JSONResponse:
+    with track(name, request) as trace:
+        loaded = await load_model(name)
+        engine = pick_engine(loaded, engine)
+
+        with trace.stage("validation"):
+            raw = base.model_dump(exclude=set(type(base).model_computed_fields))
+            axes, columns = sweep_grid(name, raw, vary)
+            columns, errors = columnar.validate_columns(COLUMN_RULES[name], columns)
+        valid = errors == ""
+        categories = np.full(len(errors), None, dtype=object)
+        confidence = np.full(len(errors), None, dtype=object)
+        probabilities: Dict[str, np.ndarray] = {}
+        if valid.any():
+            with trace.stage("features"):
+                frame = columnar_frame(name, columns, valid)
+            try:
+                labels, probs, by_class = await executor.score(
+                    loaded, frame, engine, trace.timings, trace.profiles, probabilities=True
+                )
+            except (ExecutorSaturated, asyncio.TimeoutError) as e:
+                raise executor_error(e)
+            except Exception as e:
+                logger.exception("%s sweep prediction error: %s", name.capitalize(), e)
+                raise HTTPException(status_code=500, detail="Prediction failed")
+            categories[valid] = np.asarray(labels, dtype=str)
+            confidence[valid] = np.round(np.asarray(probs, dtype=float), 3)
+            for category, column in by_class.items():
+                probabilities[category] = np.full(len(errors), None, dtype=object)
+                probabilities[category][valid] = np.round(column.astype(float), 3)
+            trace.categories.update(str(label) for label in labels)
+
+        with trace.stage("serialization"):
+            shape = [len(values) for values in axes]
+            errors = np.where(valid, None, errors)
+            return JSONResponse(
+                content={
+                    "insurance_type": name,
+                    "axes": [
+                        {"field": axis.field, "values": values.tolist()}
+                        for axis, values in zip(vary, axes)
+                    ],
+                    "shape": shape,
+                    "predicted_category": categories.reshape(shape).tolist(),
+                    "confidence": confidence.reshape(shape).tolist(),
+                    "probabilities": {
+                        category: column.reshape(shape).tolist()
+                        for category, column in probabilities.items()
+                    },
+                    "errors": errors.reshape(shape).tolist(),
+                    "failed": int((~valid).sum()),
+                }
+            )
+
+
+@app.post("/health/sweep")
+async def sweep_health(request: Request, sweep: HealthSweepRequest, engine: EngineParam = None):
+    """Score ``base`` over the grid of the one or two ``vary`` axes in one pipeline
+    call. Grid cells follow the axes in order (``shape``); ``probabilities`` holds
+    one such grid per class. Cells whose values fail ``HealthUserInput``
+    validation carry an ``errors`` entry instead of a category."""
+    return await predict_sweep("health", request, sweep.base, sweep.vary, engine)
+
+
+@app.post("/car/sweep")
+async def sweep_car(request: Request, sweep: CarSweepRequest, engine: EngineParam = None):
+    """What-if grid for ``CarUserInput``; see ``/health/sweep``."""
+    return await predict_sweep("car", request, sweep.base, sweep.vary, engine)
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# Admin: model registry / hot reload
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+    elif not ADMIN_INSECURE:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN"
+        )
+
+
+def reload_model(name: str, version: Optional[str]):
+    try:
+        store.swap(name, version)
     except Exception as e:
-        logger.exception("Car prediction error: %s", e)
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        logger.exception("Reload of %s model (%s) failed: %s", name, version, e)
 
-    return JSONResponse(
-        content={
-            "insurance_type": "car",
-            "predicted_category": str(pred),
-            "confidence": round(prob, 3) if prob is not None else None,
-        }
-    )
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def list_models():
+    return {name: store.versions(name) for name in store.paths}
+
+
+@app.post(
+    "/admin/models/{name}/load",
+    status_code=202,
+    dependencies=[Depends(require_admin)],
+)
+def load_model_version(
+    name: ModelName, background: BackgroundTasks, version: Optional[str] = None
+):
+    """Load and warm ``version`` (default: registry ACTIVE) in the background,
+    then swap it in; poll ``GET /admin/models`` for the reload state."""
+    try:
+        version, _ = store.resolve(name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    background.add_task(reload_model, name, version)
+    return {"model": name, "version": version, "state": "loading"}
+
+
+@app.post("/admin/models/{name}/rollback", dependencies=[Depends(require_admin)])
+def rollback_model(name: ModelName):
+    try:
+        loaded = store.rollback(name)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"model": name, "version": loaded.version, "state": "rolled_back"}
+
+
+# Admin: request profiling
+class ProfilingConfig(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Annotated[Optional[float], Field(None, ge=0, le=1)]
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def get_profiling():
+    return request_profiler.stats()
+
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+def set_profiling(config: ProfilingConfig):
+    """Profile every prediction request (``enabled``) and/or a random sample."""
+    request_profiler.configure(config.enabled, config.sample_rate)
+    return request_profiler.stats()
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return {"profiles": request_profiler.list()}
+
+
+@app.get("/admin/profiles/{name}", dependencies=[Depends(require_admin)])
+def get_profile(name: str, format: Literal["prof", "text"] = "prof"):
+    """The raw ``.prof`` file (for flameprof/snakeviz) or a pstats text summary."""
+    try:
+        if format == "text":
+            return PlainTextResponse(request_profiler.summary(name))
+        return FileResponse(
+            request_profiler.path(name), media_type="application/octet-stream", filename=name
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,370 @@
+"""Offline inference benchmarks for the models and the API.
+
+Everything runs in-process, so no server, network or external service is
+needed. The suites are:
+
+* ``pipeline``: raw ``predict`` / ``predict_proba`` at several batch sizes;
+* ``features``: ``HealthUserInput`` / ``CarUserInput`` validation plus
+  feature construction, per record, and the vectorized bulk path;
+* ``http``: sequential end-to-end requests through an in-process ASGI client;
+* ``load``: a concurrent load generator against the same ASGI app.
+
+Each result has p50/p95/p99 latency and throughput. The JSON report also
+holds peak RSS and the model versions and git commit it ran against.
+``compare`` flags regressions between two reports.
+
+    python benchmark.py run --output bench/base.json
+    python benchmark.py run --suite http --suite load --version car=20260101T000000Z-1a2b3c4d
+    python benchmark.py compare bench/base.json bench/new.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SUITES = ("pipeline", "features", "http", "load")
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+
+def summarize(samples: List[float], items_per_sample: int = 1) -> Dict[str, float]:
+    """Latency percentiles (ms) and items/s for per-call durations in seconds."""
+    ms = np.asarray(samples) * 1000
+    total = float(np.sum(samples))
+    return {
+        "calls": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "throughput_per_s": round(len(samples) * items_per_sample / total, 1) if total else None,
+    }
+
+
+def timed_calls(fn: Callable[[], Any], repeats: int, warmup: int = 2) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# -----------------------
+# Inputs
+# -----------------------
+def health_payloads(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``/health/predict`` bodies sampled from insurance.csv (height in feet)."""
+    df = pd.read_csv("insurance.csv").sample(n, replace=True, random_state=seed)
+    return [
+        {
+            "age": int(row.age),
+            "weight": float(row.weight),
+            "height": round(float(row.height) / 0.3048, 3),
+            "income_lpa": float(row.income_lpa),
+            "smoker": bool(row.smoker),
+            "city": str(row.city),
+            "occupation": str(row.occupation),
+        }
+        for row in df.itertuples()
+    ]
+
+
+def car_payloads(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    from inference import CAR_COLUMNS
+
+    df = pd.read_csv("Car_Dataset.csv").sample(n, replace=True, random_state=seed)
+    return [
+        {field: row[column] for field, column in CAR_COLUMNS.items()}
+        for row in df.to_dict("records")
+    ]
+
+
+PAYLOADS = {"health": health_payloads, "car": car_payloads}
+
+
+# -----------------------
+# Suites
+# -----------------------
+def bench_pipeline(store, batch_sizes=BATCH_SIZES, repeats: int = 30) -> Dict[str, Any]:
+    import app
+
+    results = {}
+    for name in ("health", "car"):
+        loaded = store.get(name)
+        if loaded is None:
+            continue
+        payloads = PAYLOADS[name](max(batch_sizes))
+        if name == "health":
+            rows = app.health_feature_rows([app.HealthUserInput(**p) for p in payloads])
+        else:
+            rows = [app.car_features(app.CarUserInput(**p)) for p in payloads]
+        frame = pd.DataFrame(rows)[list(loaded.pipeline.feature_names_in_)]
+        for size in batch_sizes:
+            X = frame.iloc[:size]
+            n = max(3, repeats // max(1, size // 100))
+            for method in ("predict", "predict_proba"):
+                fn = getattr(loaded.pipeline, method)
+                results[f"{name}.{method}.batch_{size}"] = summarize(
+                    timed_calls(lambda: fn(X), n), size
+                )
+    return results
+
+
+def bench_features(n: int = 2000) -> Dict[str, Any]:
+    import app
+    import features
+
+    results = {}
+    health = health_payloads(n)
+    car = car_payloads(n)
+    it = iter(range(10**9))
+    results["health.single_record"] = summarize(
+        timed_calls(
+            lambda: app.health_features(app.HealthUserInput(**health[next(it) % n])), n
+        )
+    )
+    results["car.single_record"] = summarize(
+        timed_calls(lambda: app.car_features(app.CarUserInput(**car[next(it) % n])), n)
+    )
+    frame = pd.read_csv("insurance.csv").sample(100_000, replace=True, random_state=0)
+    results["health.bulk_100k_rows"] = summarize(
+        timed_calls(lambda: features.health_features(frame), 5), len(frame)
+    )
+    return results
+
+
+def _asgi_client(app_module):
+    import httpx
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench"
+    )
+
+
+async def bench_http(app_module, n: int = 300) -> Dict[str, Any]:
+    results = {}
+    async with _asgi_client(app_module) as client:
+        for name in ("health", "car"):
+            payloads = PAYLOADS[name](n, seed=1)
+            samples, errors = [], 0
+            for payload in payloads[:5]:
+                await client.post(f"/{name}/predict", json=payload)
+            for payload in payloads:
+                start = time.perf_counter()
+                response = await client.post(f"/{name}/predict", json=payload)
+                samples.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+            results[f"{name}.predict"] = dict(summarize(samples), errors=errors)
+            batch = PAYLOADS[name](100, seed=2)
+            samples = []
+            for _ in range(max(5, n // 30)):
+                start = time.perf_counter()
+                await client.post(f"/{name}/predict/batch", json=batch)
+                samples.append(time.perf_counter() - start)
+            results[f"{name}.predict_batch_100"] = summarize(samples, 100)
+    return results
+
+
+async def bench_load(app_module, concurrency: int = 32, requests: int = 1000) -> Dict[str, Any]:
+    results = {}
+    async with _asgi_client(app_module) as client:
+        for name in ("health", "car"):
+            payloads = PAYLOADS[name](requests, seed=3)
+            queue = iter(payloads)
+            samples, statuses = [], {}
+
+            async def worker():
+                for payload in queue:
+                    start = time.perf_counter()
+                    response = await client.post(f"/{name}/predict", json=payload)
+                    samples.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            wall = time.perf_counter() - start
+            result = summarize(samples)
+            # concurrent calls overlap, so throughput is requests over wall time
+            result["throughput_per_s"] = round(len(samples) / wall, 1)
+            result.update(concurrency=concurrency, statuses={str(k): v for k, v in statuses.items()})
+            results[f"{name}.predict"] = result
+    return results
+
+
+# -----------------------
+# Runner
+# -----------------------
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run_app_suites(app_module, suites, args):
+    results = {}
+    # lifespan runs the app's startup/shutdown hooks (model loading, executor)
+    async with app_module.app.router.lifespan_context(app_module.app):
+        for spec in args.version:
+            name, _, version = spec.partition("=")
+            app_module.store.swap(name, version, activate=False)
+        if "pipeline" in suites:
+            results["pipeline"] = bench_pipeline(app_module.store, repeats=args.repeats)
+        if "http" in suites:
+            results["http"] = await bench_http(app_module, args.requests)
+        if "load" in suites:
+            results["load"] = await bench_load(app_module, args.concurrency, args.requests)
+        models = {
+            name: {"version": loaded.version, "sha256": loaded.info.get("sha256")}
+            for name, loaded in ((n, app_module.store.get(n)) for n in app_module.store.paths)
+            if loaded is not None
+        }
+    return results, models
+
+
+def run(args) -> Dict[str, Any]:
+    import sklearn
+
+    if not args.prediction_cache:
+        # payloads repeat dataset rows, so cache hits would hide the model
+        os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    import app
+    from model_store import memory_usage
+
+    suites = args.suite or list(SUITES)
+    started = time.perf_counter()
+    results, models = asyncio.run(_run_app_suites(app, suites, args))
+    config = {
+        "prediction_cache": app.prediction_cache.enabled,
+        "car_lookup_table": app.car_table is not None,
+        "inference_engine": app.INFERENCE_ENGINE,
+        "executor": app.executor.kind,
+        "micro_batch": app.batcher is not None,
+    }
+    if "features" in suites:
+        results["features"] = bench_features()
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sklearn": sklearn.__version__,
+            "cpu_count": os.cpu_count(),
+            "models": models,
+            "config": config,
+            "suites": suites,
+            "seconds": round(time.perf_counter() - started, 2),
+        },
+        "memory": memory_usage(),
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-metric changes; latency up or throughput down by > threshold regresses."""
+    rows = []
+    for suite, cases in new["results"].items():
+        for case, metrics in cases.items():
+            old = base["results"].get(suite, {}).get(case)
+            if old is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s"):
+                if not old.get(metric) or metrics.get(metric) is None:
+                    continue
+                change = metrics[metric] / old[metric] - 1
+                worse = -change if metric == "throughput_per_s" else change
+                rows.append(
+                    {
+                        "case": f"{suite}.{case}",
+                        "metric": metric,
+                        "base": old[metric],
+                        "new": metrics[metric],
+                        "change": round(change, 4),
+                        "regression": worse > threshold,
+                    }
+                )
+    peak_old, peak_new = base["memory"].get("peak_rss_bytes"), new["memory"].get("peak_rss_bytes")
+    if peak_old and peak_new:
+        change = peak_new / peak_old - 1
+        rows.append(
+            {
+                "case": "memory",
+                "metric": "peak_rss_bytes",
+                "base": peak_old,
+                "new": peak_new,
+                "change": round(change, 4),
+                "regression": change > threshold,
+            }
+        )
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inference benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="run the suites and write a JSON report")
+    run_p.add_argument("--suite", action="append", choices=SUITES, help="repeatable; default all")
+    run_p.add_argument("--output", help="report path (default: stdout)")
+    run_p.add_argument("--repeats", type=int, default=30, help="pipeline calls per batch size")
+    run_p.add_argument("--requests", type=int, default=300, help="HTTP/load requests per model")
+    run_p.add_argument("--concurrency", type=int, default=32)
+    run_p.add_argument(
+        "--version",
+        action="append",
+        default=[],
+        metavar="NAME=VERSION",
+        help="benchmark a registry version instead of the active one",
+    )
+    run_p.add_argument(
+        "--prediction-cache", action="store_true", help="keep the API prediction cache on"
+    )
+    cmp_p = sub.add_parser("compare", help="flag regressions between two reports")
+    cmp_p.add_argument("base")
+    cmp_p.add_argument("new")
+    cmp_p.add_argument("--threshold", type=float, default=0.1, help="relative change, 0.1 = 10%")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+            print(f"Wrote {args.output}")
+        else:
+            print(text)
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['case']:45s} {row['metric']:17s} {row['base']:>12} -> {row['new']:>12} "
+            f"{row['change']:+8.1%} {flag}"
+        )
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Offline bulk scoring of quote files, chunk by chunk.
+
+Reads a CSV or Parquet file with the ``insurance.csv`` (health) or
+``Car_Dataset.csv`` (car) schema in fixed-size chunks, builds the model
+input for each chunk with the vectorized ``features`` module, scores it
+with one ``predict_proba`` call and streams the rows, plus
+``predicted_category`` and ``confidence``, to a CSV or Parquet output. Memory stays bounded by
+``--chunk-size`` x in-flight chunks whatever the file size. With
+``--workers N`` chunks are scored in N processes that each load the
+artifact, and written back in input order. The output is written to
+``<output>.tmp`` and only moved into place once every chunk is scored; a
+run that scores nothing leaves an existing output alone and exits 1.
+
+    python bulk_score.py health insurance.csv scored.csv
+    python bulk_score.py car quotes.parquet scored.parquet --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+import joblib
+import pandas as pd
+
+from features import HEIGHT_UNITS, health_features
+from inference import CAR_COLUMNS, predict_with_confidence
+from model_store import ModelStore
+
+DEFAULT_MODELS = {
+    "health": "models/health_insurance_model.pkl",
+    "car": "models/car_insurance_model.pkl",
+}
+
+
+# -----------------------
+# Model input frames
+# -----------------------
+def car_frame(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Car pipeline columns; accepts dataset headers or ``CarUserInput`` names."""
+    return chunk.rename(columns=CAR_COLUMNS)[list(CAR_COLUMNS.values())].astype(float)
+
+
+def model_frame(kind: str, chunk: pd.DataFrame, height_unit: str = "m") -> pd.DataFrame:
+    if kind == "health":
+        return health_features(chunk, height_unit)
+    return car_frame(chunk)
+
+
+KINDS = ("car", "health")
+
+
+# -----------------------
+# Chunked IO
+# -----------------------
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        chunks = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_size)
+    # a header-only CSV yields one empty chunk, which the model can't score
+    yield from (chunk for chunk in chunks if len(chunk))
+
+
+class ChunkWriter:
+    """Appends scored chunks to ``<path>.tmp``, a CSV or Parquet file by the
+    extension of ``path``. :meth:`commit` moves it to ``path``; :meth:`abort`
+    deletes it, so a failed run never leaves a partial file at ``path``, and a
+    run that wrote nothing leaves an existing ``path`` as it was."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._parquet = None
+        self._header = True
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.tmp_path, mode="a", header=self._header, index=False)
+            self._header = False
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def commit(self) -> None:
+        self.close()
+        if os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def check_paths(input_path: str, output_path: str) -> None:
+    """Refuse to write over the input (directly or through a symlink)."""
+    if os.path.realpath(output_path) == os.path.realpath(input_path):
+        raise ValueError(f"Output {output_path} is the input file")
+
+
+# -----------------------
+# Scoring
+# -----------------------
+_model = None
+
+
+def _init_worker(model_path: str) -> None:
+    global _model
+    _model = joblib.load(model_path)
+
+
+def score_chunk(kind: str, chunk: pd.DataFrame, height_unit: str = "m") -> pd.DataFrame:
+    labels, confidence = predict_with_confidence(_model, model_frame(kind, chunk, height_unit))
+    out = chunk.copy()
+    out["predicted_category"] = labels
+    out["confidence"] = confidence
+    return out
+
+
+def score_file(
+    kind: str,
+    input_path: str,
+    output_path: str,
+    model_path: str,
+    chunk_size: int = 100_000,
+    workers: int = 1,
+    height_unit: str = "m",
+) -> Dict[str, Any]:
+    check_paths(input_path, output_path)
+    start = time.perf_counter()
+    writer = ChunkWriter(output_path)
+    rows = chunks = 0
+    try:
+        if workers <= 1:
+            _init_worker(model_path)
+            for chunk in read_chunks(input_path, chunk_size):
+                writer.write(score_chunk(kind, chunk, height_unit))
+                rows += len(chunk)
+                chunks += 1
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(model_path,)
+            ) as pool:
+                # bound the chunks held in memory; results are written in input order
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(score_chunk, kind, chunk, height_unit))
+                    if len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        rows += len(scored)
+                        chunks += 1
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+                    chunks += 1
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+    seconds = time.perf_counter() - start
+    return {
+        "model": model_path,
+        "output": output_path,
+        "rows": rows,
+        "chunks": chunks,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a quote file in chunks")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("input", help="CSV or Parquet input")
+    parser.add_argument("output", help="CSV or Parquet output (by extension)")
+    parser.add_argument(
+        "--model", help="artifact path (default: the registry's active version)"
+    )
+    parser.add_argument("--version", help="registry version to score with")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1, help="0 = one per core")
+    parser.add_argument(
+        "--height-unit",
+        choices=sorted(HEIGHT_UNITS),
+        default="m",
+        help="unit of the health 'height' column (insurance.csv uses metres)",
+    )
+    args = parser.parse_args(argv)
+
+    model_path: Optional[str] = args.model
+    if model_path is None:
+        _, model_path = ModelStore(DEFAULT_MODELS).resolve(args.kind, args.version)
+    try:
+        check_paths(args.input, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    workers = args.workers or os.cpu_count() or 1
+    stats = score_file(
+        args.kind,
+        args.input,
+        args.output,
+        model_path,
+        args.chunk_size,
+        workers,
+        args.height_unit,
+    )
+    print(json.dumps(stats, indent=2))
+    if not stats["rows"]:
+        print(f"No rows scored; {args.output} was not written", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Precomputed lookup table for the car model's discrete input space.
+
+Every ``CarUserInput`` field is a bounded integer except mileage, and the
+realistic domain in ``Car_Dataset.csv`` is small. The offline ``build`` step
+scores the trained car pipeline over a configurable grid and stores the
+predicted class index and confidence as raw ``.npy`` arrays, memory-mapped
+by the API. ``/car/predict`` then answers in O(1) for inputs on the grid and
+falls back to the model otherwise.
+
+By default ``car_age`` is not a grid axis: the dataset always satisfies
+``car_age == 2025 - car_manufacturing_year``, so it is derived from the year
+and inputs that break that relation fall back to the model.
+
+    python car_lookup.py build
+    python car_lookup.py build --axis annual_mileage_x1000=0:40:1 --reference-year 2026
+    python car_lookup.py bench
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from inference import CAR_COLUMNS
+
+LOOKUP_DIR = os.path.join("models", "car_lookup")
+# how far (in steps) an input may sit from a grid point and still hit it
+GRID_TOLERANCE = 1e-9
+
+
+@dataclass
+class Axis:
+    field: str
+    start: float
+    stop: float  # inclusive
+    step: float = 1.0
+
+    @property
+    def size(self) -> int:
+        return int(round((self.stop - self.start) / self.step)) + 1
+
+    def values(self) -> np.ndarray:
+        return self.start + self.step * np.arange(self.size)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Axis":
+        """``field=start:stop[:step]``"""
+        field, _, bounds = spec.partition("=")
+        parts = [float(p) for p in bounds.split(":")]
+        return cls(field.strip(), *parts)
+
+
+# ranges observed in Car_Dataset.csv (mileage widened to the API's usual inputs)
+DEFAULT_AXES = [
+    Axis("driver_age", 18, 65),
+    Axis("driver_experience", 0, 40),
+    Axis("previous_accidents", 0, 5),
+    Axis("annual_mileage_x1000", 5, 25),
+    Axis("car_manufacturing_year", 1990, 2025),
+]
+DEFAULT_REFERENCE_YEAR = 2025
+
+
+class CarLookupTable:
+    def __init__(
+        self,
+        axes: List[Axis],
+        classes: np.ndarray,
+        labels: np.ndarray,
+        confidence: np.ndarray,
+        reference_year: Optional[int],
+        meta: Dict[str, Any],
+    ):
+        self.axes = axes
+        self.classes = classes
+        self.labels = labels
+        self.confidence = confidence
+        self.reference_year = reference_year
+        self.meta = meta
+        self.shape = tuple(a.size for a in axes)
+        self.strides = np.cumprod((1,) + self.shape[::-1])[:-1][::-1].tolist()
+        self._class_names = [str(c) for c in classes]
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self.meta.get("model_sha256")
+
+    def lookup(self, raw: Mapping[str, Any]) -> Optional[Tuple[str, float]]:
+        """(label, confidence) for an in-grid ``CarUserInput`` dict, else None."""
+        if self.reference_year is not None:
+            if raw["car_age"] != self.reference_year - raw["car_manufacturing_year"]:
+                return None
+        flat = 0
+        for axis, stride in zip(self.axes, self.strides):
+            offset = (raw[axis.field] - axis.start) / axis.step
+            index = int(round(offset))
+            # tolerance: with a step like 0.1, (12.3 - 0) / 0.1 is 122.99999999999999
+            if abs(index - offset) > GRID_TOLERANCE or not 0 <= index < axis.size:
+                return None
+            flat += index * stride
+        return self._class_names[self.labels[flat]], float(self.confidence[flat])
+
+    @classmethod
+    def load(cls, directory: str = LOOKUP_DIR, mmap: bool = True) -> "CarLookupTable":
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        return cls(
+            axes=[Axis(**a) for a in meta["axes"]],
+            classes=np.array(meta["classes"], dtype=object),
+            labels=np.load(os.path.join(directory, "labels.npy"), mmap_mode=mode),
+            confidence=np.load(os.path.join(directory, "confidence.npy"), mmap_mode=mode),
+            reference_year=meta["reference_year"],
+            meta=meta,
+        )
+
+
+def grid_frame(axes: List[Axis], reference_year: Optional[int], flat_index):
+    """Pipeline input DataFrame for a slice of the flattened grid."""
+    import pandas as pd
+
+    shape = tuple(a.size for a in axes)
+    coords = np.unravel_index(flat_index, shape)
+    fields = {a.field: a.start + a.step * c for a, c in zip(axes, coords)}
+    if reference_year is not None:
+        fields["car_age"] = reference_year - fields["car_manufacturing_year"]
+    return pd.DataFrame({CAR_COLUMNS[f]: fields[f] for f in CAR_COLUMNS})
+
+
+def build_table(
+    pipeline,
+    model_path: str,
+    axes: List[Axis] = DEFAULT_AXES,
+    reference_year: Optional[int] = DEFAULT_REFERENCE_YEAR,
+    directory: str = LOOKUP_DIR,
+    chunk_size: int = 100_000,
+    n_jobs: int = -1,
+) -> Dict[str, Any]:
+    from numpy.lib.format import open_memmap
+
+    from model_registry import file_sha256
+
+    fields = {a.field for a in axes}
+    expected = set(CAR_COLUMNS) - ({"car_age"} if reference_year is not None else set())
+    if fields != expected:
+        raise ValueError(f"Grid axes must be exactly {sorted(expected)}, got {sorted(fields)}")
+    if len(pipeline.classes_) > 255:
+        raise ValueError("Too many classes for a uint8 label table")
+
+    axes = sorted(axes, key=lambda a: list(CAR_COLUMNS).index(a.field))
+    total = int(np.prod([a.size for a in axes]))
+    tmp = f"{directory}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    labels = open_memmap(os.path.join(tmp, "labels.npy"), "w+", np.uint8, (total,))
+    confidence = open_memmap(
+        os.path.join(tmp, "confidence.npy"), "w+", np.float32, (total,)
+    )
+
+    forest = pipeline[-1]
+    old_jobs = getattr(forest, "n_jobs", None)
+    forest.n_jobs = n_jobs
+    start = time.perf_counter()
+    try:
+        for lo in range(0, total, chunk_size):
+            hi = min(lo + chunk_size, total)
+            proba = pipeline.predict_proba(grid_frame(axes, reference_year, np.arange(lo, hi)))
+            best = proba.argmax(axis=1)
+            labels[lo:hi] = best
+            confidence[lo:hi] = proba[np.arange(len(best)), best]
+            print(f"  scored {hi:,}/{total:,} cells", end="\r", flush=True)
+    finally:
+        forest.n_jobs = old_jobs
+    labels.flush()
+    confidence.flush()
+    del labels, confidence
+
+    meta = {
+        "axes": [asdict(a) for a in axes],
+        "reference_year": reference_year,
+        "classes": [str(c) for c in pipeline.classes_],
+        "cells": total,
+        "model_path": model_path,
+        "model_sha256": file_sha256(model_path),
+        "build_seconds": round(time.perf_counter() - start, 2),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.isdir(directory):
+        import shutil
+
+        shutil.rmtree(directory)
+    os.replace(tmp, directory)
+    return meta
+
+
+def benchmark(model_path: str, directory: str = LOOKUP_DIR, n: int = 2000) -> Dict[str, float]:
+    """Microseconds per single-record prediction: table vs live forest."""
+    import joblib
+
+    from fast_encoder import compile_encoder
+    from flat_forest import FlatForest
+    from inference import score_rows
+
+    table = CarLookupTable.load(directory)
+    pipeline = joblib.load(model_path)
+    encoder = compile_encoder(pipeline)
+    forest = FlatForest.from_estimator(pipeline)
+
+    rng = np.random.default_rng(0)
+    raws = []
+    for _ in range(n):
+        raw = {a.field: float(rng.choice(a.values())) for a in table.axes}
+        if table.reference_year is not None:
+            raw["car_age"] = table.reference_year - raw["car_manufacturing_year"]
+        raws.append(raw)
+    rows = [{CAR_COLUMNS[k]: v for k, v in raw.items()} for raw in raws]
+
+    def timed(fn, items):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        return (time.perf_counter() - start) / len(items) * 1e6
+
+    results = {
+        "lookup_us": timed(table.lookup, raws),
+        "flat_forest_us": timed(
+            lambda r: score_rows(pipeline, [r], encoder, forest, "flat"), rows
+        ),
+        "sklearn_forest_us": timed(
+            lambda r: score_rows(pipeline, [r], encoder, forest, "sklearn"),
+            rows[: max(1, n // 10)],
+        ),
+    }
+    mismatches = sum(
+        table.lookup(raw)[0] != str(score_rows(pipeline, [row], encoder, forest, "flat")[0][0])
+        for raw, row in zip(raws[:200], rows[:200])
+    )
+    results["label_mismatches_of_200"] = mismatches
+    return results
+
+
+def main(argv=None) -> int:
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Car model lookup table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="score the grid and write the table")
+    build.add_argument("--model", default="models/car_insurance_model.pkl")
+    build.add_argument("--output", default=LOOKUP_DIR)
+    build.add_argument(
+        "--axis",
+        action="append",
+        default=[],
+        help="override an axis: field=start:stop[:step] (repeatable)",
+    )
+    build.add_argument(
+        "--reference-year",
+        type=int,
+        default=DEFAULT_REFERENCE_YEAR,
+        help="derive car_age = year - manufacturing year; 0 makes car_age an axis",
+    )
+    build.add_argument("--chunk-size", type=int, default=100_000)
+    bench = sub.add_parser("bench", help="compare table lookups with the live forest")
+    bench.add_argument("--model", default="models/car_insurance_model.pkl")
+    bench.add_argument("--table", default=LOOKUP_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        reference_year = args.reference_year or None
+        axes = {a.field: a for a in DEFAULT_AXES}
+        if reference_year is None:
+            axes["car_age"] = Axis("car_age", 0, 35)
+        for spec in args.axis:
+            axis = Axis.parse(spec)
+            axes[axis.field] = axis
+        meta = build_table(
+            joblib.load(args.model),
+            args.model,
+            list(axes.values()),
+            reference_year,
+            args.output,
+            args.chunk_size,
+        )
+        size = sum(
+            os.path.getsize(os.path.join(args.output, f))
+            for f in ("labels.npy", "confidence.npy")
+        )
+        print(
+            f"\nBuilt {meta['cells']:,} cells ({size / 1e6:.1f} MB) "
+            f"in {meta['build_seconds']}s -> {args.output}"
+        )
+        return 0
+
+    print(json.dumps(benchmark(args.model, args.table), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
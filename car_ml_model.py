@@ -1,14 +1,59 @@
+"""Train the car premium category model and register it.
+
+The hyperparameter search is resumable: every completed trial (its params,
+fold scores and timings) is appended to a JSONL file under
+``models/.cache/search`` keyed by the data, split and search space, and a
+rerun skips the trials already on disk. All pending (candidate, fold) fits run
+in one joblib pool, as in ``RandomizedSearchCV``, on the same unshuffled
+``StratifiedKFold`` folds. The preprocessor is cached per fold with
+``Pipeline(memory=...)`` so candidates sharing a fold don't refit it.
+``--search halving`` runs ``HalvingRandomSearchCV`` instead (not resumable).
+
+``--update NEW_DATA`` retrains incrementally instead: it loads the active
+registered version, keeps its category thresholds and fitted preprocessor,
+adds ``--add-trees`` warm-started trees fit on the new batch only and
+registers the result as a new version.
+
+    python car_ml_model.py
+    python car_ml_model.py --n-iter 40 --cv 5 --n-jobs -1
+    python car_ml_model.py --search halving --no-register
+    python car_ml_model.py --update new_quotes.csv --add-trees 50
+"""
+
+import argparse
+import hashlib
+import json
 import os
-import joblib
-import pandas as pd
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
 import numpy as np
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import (
+    ParameterSampler,
+    StratifiedKFold,
+    train_test_split,
+)
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report
+from sklearn.metrics import classification_report, f1_score
+from sklearn.utils.class_weight import compute_class_weight
+
+from model_registry import (
+    REGISTRY_DIR,
+    active_version,
+    artifact_path,
+    file_sha256,
+    read_manifest,
+    register_model,
+)
+from model_store import save_model
 
 from scipy.stats import randint as sp_randint
 
@@ -17,126 +62,502 @@ from scipy.stats import randint as sp_randint
 # =======================
 DATA_PATH = "Car_Dataset.csv"
 NUMERICAL_TARGET = "Insurance Premium"
+TARGET = "insurance_premium_category"
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
+MODEL_PATH = "models/car_insurance_model.pkl"
+CACHE_DIR = os.path.join("models", ".cache")
 
-# =======================
-# LOAD DATA
-# =======================
-df = pd.read_csv(DATA_PATH)
+PARAM_DISTRIBUTIONS = {
+    "model__n_estimators": sp_randint(150, 400),
+    "model__max_depth": [None, 10, 20],
+    "model__min_samples_split": sp_randint(2, 6),
+}
 
-if NUMERICAL_TARGET not in df.columns:
-    raise ValueError(f"{NUMERICAL_TARGET} not found in dataset")
 
-q1 = df[NUMERICAL_TARGET].quantile(0.33)
-q2 = df[NUMERICAL_TARGET].quantile(0.66)
+# =======================
+# DATA
+# =======================
+def category_thresholds(premium: pd.Series) -> Tuple[float, float]:
+    """Premium cut points between Low/Medium and Medium/High."""
+    return float(premium.quantile(0.33)), float(premium.quantile(0.66))
 
 
-def premium_category(value):
-    if value <= q1:
-        return "Low"
-    elif value <= q2:
-        return "Medium"
-    else:
-        return "High"
+def premium_category(premium, q1: float, q2: float) -> np.ndarray:
+    premium = np.asarray(premium, dtype=float)
+    return np.select([premium <= q1, premium <= q2], ["Low", "Medium"], "High").astype(object)
 
 
-df["insurance_premium_category"] = df[NUMERICAL_TARGET].apply(premium_category)
+def load_data(
+    path: str = DATA_PATH, thresholds: Optional[Tuple[float, float]] = None
+) -> Tuple[pd.DataFrame, pd.Series, Tuple[float, float]]:
+    """(X, y, (q1, q2)); thresholds are computed from the data unless given."""
+    df = pd.read_csv(path)
+    if NUMERICAL_TARGET not in df.columns:
+        raise ValueError(f"{NUMERICAL_TARGET} not found in dataset")
+    q1, q2 = thresholds or category_thresholds(df[NUMERICAL_TARGET])
+    y = pd.Series(premium_category(df[NUMERICAL_TARGET], q1, q2), name=TARGET)
+    X = df.drop(columns=[NUMERICAL_TARGET])
+    return X, y, (q1, q2)
 
-print("Category distribution:")
-print(df["insurance_premium_category"].value_counts())
 
 # =======================
-# FEATURES & TARGET
+# PIPELINE
 # =======================
-TARGET = "insurance_premium_category"
-X = df.drop(columns=[TARGET, NUMERICAL_TARGET])
-y = df[TARGET]
+def build_pipeline(X: pd.DataFrame, memory: Optional[str] = None) -> Pipeline:
+    # Auto feature detection
+    num_features = X.select_dtypes(include=["number"]).columns.tolist()
+    cat_features = X.select_dtypes(exclude=["number"]).columns.tolist()
+
+    num_pipeline = Pipeline(
+        steps=[
+            ("imputer", SimpleImputer(strategy="median")),
+            ("scaler", StandardScaler()),
+        ]
+    )
+    cat_pipeline = Pipeline(
+        steps=[
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("encoder", OneHotEncoder(handle_unknown="ignore")),
+        ]
+    )
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", num_pipeline, num_features),
+            ("cat", cat_pipeline, cat_features),
+        ]
+    )
+    rf = RandomForestClassifier(random_state=RANDOM_STATE, class_weight="balanced")
+    return Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            ("model", rf),
+        ],
+        memory=memory,
+    )
 
-# Auto feature detection
-num_features = X.select_dtypes(include=["number"]).columns.tolist()
-cat_features = X.select_dtypes(exclude=["number"]).columns.tolist()
 
 # =======================
-# PREPROCESSING
+# HYPERPARAMETER SEARCH
 # =======================
-num_pipeline = Pipeline(
-    steps=[
-        ("imputer", SimpleImputer(strategy="median")),
-        ("scaler", StandardScaler()),
-    ]
-)
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
 
-cat_pipeline = Pipeline(
-    steps=[
-        ("imputer", SimpleImputer(strategy="most_frequent")),
-        ("encoder", OneHotEncoder(handle_unknown="ignore")),
-    ]
-)
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", num_pipeline, num_features),
-        ("cat", cat_pipeline, cat_features),
-    ]
-)
+def _describe(distribution) -> str:
+    # frozen scipy distributions repr as an address; use their arguments
+    args = getattr(distribution, "args", None)
+    if args is not None:
+        return f"{distribution.dist.name}{args}"
+    return repr(distribution)
 
-# =======================
-# MODEL + PIPELINE
-# =======================
-rf = RandomForestClassifier(random_state=RANDOM_STATE, class_weight="balanced")
 
-pipeline = Pipeline(
-    steps=[
-        ("preprocessor", preprocessor),
-        ("model", rf),
-    ]
-)
+def search_fingerprint(data_path: str, cv: int) -> str:
+    """Identifies a search whose trials can be reused: data, split, space."""
+    spec = {
+        "data_sha256": file_sha256(data_path),
+        "test_size": TEST_SIZE,
+        "random_state": RANDOM_STATE,
+        "cv": cv,
+        "splitter": "StratifiedKFold",
+        "space": {k: _describe(v) for k, v in PARAM_DISTRIBUTIONS.items()},
+    }
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    return digest[:16]
 
-# =======================
-# HYPERPARAMETER SEARCH
-# =======================
-param_grid = {
-    "model__n_estimators": sp_randint(150, 400),
-    "model__max_depth": [None, 10, 20],
-    "model__min_samples_split": sp_randint(2, 6),
-}
 
-search = RandomizedSearchCV(
-    pipeline,
-    param_distributions=param_grid,
-    n_iter=20,
-    cv=5,
-    scoring="f1_macro",
-    n_jobs=-1,
-    random_state=RANDOM_STATE,
-)
+def _load_trials(path: str) -> Dict[str, Dict[str, Any]]:
+    trials = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                # a crash mid-write leaves at most one partial last line
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                trials[trial["key"]] = trial
+    return trials
+
+
+def _fit_fold(pipeline, params, X, y, train, test) -> Tuple[float, float, float, float, float]:
+    """(macro F1, fit seconds, score seconds, start and end epoch times) of one
+    candidate on one fold; the epoch times are comparable across workers."""
+    started = time.time()
+    model = clone(pipeline).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X.iloc[train], y.iloc[train])
+    fitted = time.perf_counter()
+    score = f1_score(y.iloc[test], model.predict(X.iloc[test]), average="macro")
+    return float(score), fitted - start, time.perf_counter() - fitted, started, time.time()
+
+
+def random_search(
+    pipeline: Pipeline,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    trials_path: str,
+    n_iter: int = 20,
+    cv: int = 5,
+    n_jobs: int = -1,
+    resume: bool = True,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Randomized search that persists each trial; returns (best params, trials).
+
+    Every (pending candidate, fold) fit is dispatched to one joblib pool, as
+    ``RandomizedSearchCV`` does, and a trial is written to ``trials_path`` as
+    soon as its last fold finishes. A trial's ``wall_seconds`` runs from the
+    start of its first fold to the end of its last, so with folds running in
+    parallel it is less than ``fit_seconds + score_seconds``.
+    """
+    done = _load_trials(trials_path) if resume else {}
+    if not resume and os.path.exists(trials_path):
+        os.remove(trials_path)
+    os.makedirs(os.path.dirname(trials_path), exist_ok=True)
+    # the splitter RandomizedSearchCV(cv=int) uses for classifiers
+    splits = list(StratifiedKFold(n_splits=cv).split(X_train, y_train))
+
+    sampler = ParameterSampler(PARAM_DISTRIBUTIONS, n_iter=n_iter, random_state=RANDOM_STATE)
+    candidates = [{k: _plain(v) for k, v in params.items()} for params in sampler]
+    keys = [json.dumps(params, sort_keys=True) for params in candidates]
+    trials: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+    for i, key in enumerate(keys):
+        if key in done:
+            trials[i] = dict(done[key], resumed=True)
+            _print_trial(i, trials[i])
+
+    pending = [i for i, trial in enumerate(trials) if trial is None]
+    jobs = [(i, fold) for i in pending for fold in range(cv)]
+    results = (
+        Parallel(n_jobs=n_jobs, return_as="generator")(
+            delayed(_fit_fold)(pipeline, candidates[i], X_train, y_train, *splits[fold])
+            for i, fold in jobs
+        )
+        if jobs
+        else []
+    )
+    folds: Dict[int, List[Tuple[float, ...]]] = {i: [] for i in pending}
+    for (i, _), result in zip(jobs, results):
+        folds[i].append(result)
+        if len(folds[i]) < cv:
+            continue
+        scores, fit_times, score_times, starts, ends = (
+            np.array(column) for column in zip(*folds.pop(i))
+        )
+        trial = {
+            "key": keys[i],
+            "params": candidates[i],
+            "mean_test_score": float(scores.mean()),
+            "std_test_score": float(scores.std()),
+            "fold_scores": scores.round(6).tolist(),
+            "fit_seconds": float(fit_times.sum()),
+            "score_seconds": float(score_times.sum()),
+            "wall_seconds": float(ends.max() - starts.min()),
+        }
+        with open(trials_path, "a") as f:
+            f.write(json.dumps(trial) + "\n")
+        trials[i] = dict(trial, resumed=False)
+        _print_trial(i, trials[i])
+    best = max(trials, key=lambda t: t["mean_test_score"])
+    return best["params"], trials
+
+
+def halving_search(
+    pipeline: Pipeline,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    n_candidates: int = 20,
+    cv: int = 5,
+    n_jobs: int = -1,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Successive halving over the same space; trials come from ``cv_results_``.
+
+    ``n_candidates`` start on a small sample of rows and the best third
+    advance to each larger round.
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingRandomSearchCV
+
+    search = HalvingRandomSearchCV(
+        pipeline,
+        param_distributions=PARAM_DISTRIBUTIONS,
+        n_candidates=n_candidates,
+        cv=cv,
+        scoring="f1_macro",
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE,
+        refit=False,
+    )
+    search.fit(X_train, y_train)
+    results = search.cv_results_
+    trials = []
+    for i in range(len(results["params"])):
+        trial = {
+            "params": {k: _plain(v) for k, v in results["params"][i].items()},
+            "iteration": int(results["iter"][i]),
+            "n_resources": int(results["n_resources"][i]),
+            "mean_test_score": float(results["mean_test_score"][i]),
+            "std_test_score": float(results["std_test_score"][i]),
+            "fit_seconds": float(results["mean_fit_time"][i] * cv),
+            "score_seconds": float(results["mean_score_time"][i] * cv),
+            "resumed": False,
+        }
+        trials.append(trial)
+        _print_trial(i, trial)
+    return {k: _plain(v) for k, v in search.best_params_.items()}, trials
+
+
+def _print_trial(i: int, trial: Dict[str, Any]) -> None:
+    params = ", ".join(f"{k.split('__')[-1]}={v}" for k, v in trial["params"].items())
+    wall = trial.get("wall_seconds")
+    print(
+        f"  trial {i:3d}  f1={trial['mean_test_score']:.4f}  "
+        f"fit={trial['fit_seconds']:.2f}s"
+        + (f"  wall={wall:.2f}s" if wall is not None else "")
+        + ("  (cached)" if trial["resumed"] else "")
+        + f"  {params}"
+    )
+
 
 # =======================
 # TRAIN
 # =======================
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
-)
+def train(
+    data_path: str = DATA_PATH,
+    output: str = MODEL_PATH,
+    search: str = "random",
+    n_iter: int = 20,
+    cv: int = 5,
+    n_jobs: int = -1,
+    resume: bool = True,
+    cache_dir: Optional[str] = CACHE_DIR,
+    register: bool = True,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    X, y, (q1, q2) = load_data(data_path)
+    print("Category distribution:")
+    print(y.value_counts())
 
-search.fit(X_train, y_train)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    memory = os.path.join(cache_dir, "pipeline") if cache_dir else None
+    pipeline = build_pipeline(X, memory=memory)
 
-best_model = search.best_estimator_
+    search_start = time.perf_counter()
+    if search == "halving":
+        best_params, trials = halving_search(
+            pipeline, X_train, y_train, n_iter, cv, n_jobs
+        )
+    else:
+        trials_path = os.path.join(
+            cache_dir or CACHE_DIR,
+            "search",
+            f"car-{search_fingerprint(data_path, cv)}.jsonl",
+        )
+        best_params, trials = random_search(
+            pipeline, X_train, y_train, trials_path, n_iter, cv, n_jobs, resume
+        )
+    search_seconds = time.perf_counter() - search_start
+    best_score = max(t["mean_test_score"] for t in trials)
 
-# =======================
-# EVALUATION
-# =======================
-y_pred = best_model.predict(X_test)
-print("\nBest Parameters:")
-print(search.best_params_)
+    # refit the winner on the full training split, without the fit cache
+    best_model = build_pipeline(X).set_params(**best_params)
+    best_model.fit(X_train, y_train)
+
+    # =======================
+    # EVALUATION
+    # =======================
+    y_pred = best_model.predict(X_test)
+    print("\nBest Parameters:")
+    print(best_params)
+
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred))
+
+    # =======================
+    # SAVE MODEL
+    # =======================
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    save_model(best_model, output)
+    print(f"\n✅ Model saved as {output}")
+
+    train_seconds = time.perf_counter() - start
+    summary = {
+        "search": search,
+        "trials": len(trials),
+        "trials_resumed": sum(t["resumed"] for t in trials),
+        "search_seconds": round(search_seconds, 2),
+        "trial_fit_seconds": round(sum(t["fit_seconds"] for t in trials if not t["resumed"]), 2),
+        "train_seconds": round(train_seconds, 2),
+    }
+    print(f"Search summary: {summary}")
+    if register:
+        manifest = register_model(
+            "car",
+            best_model,
+            metrics={
+                "test_f1_macro": float(f1_score(y_test, y_pred, average="macro")),
+                "cv_f1_macro": float(best_score),
+            },
+            extra={
+                "params": best_params,
+                "category_thresholds": {"q1": q1, "q2": q2},
+                "data_path": data_path,
+                "train_seconds": summary["train_seconds"],
+                "search_summary": summary,
+            },
+            activate=True,
+        )
+        print(f"✅ Registered car model version {manifest['version']}")
+    return summary
 
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred))
 
 # =======================
-# SAVE MODEL
+# INCREMENTAL UPDATE
 # =======================
-os.makedirs("models", exist_ok=True)
-joblib.dump(best_model, "models/car_insurance_model.pkl")
+def load_base(version: Optional[str] = None, root: str = REGISTRY_DIR):
+    """(pipeline, manifest) of a registered car model; defaults to the active one."""
+    import joblib
+
+    version = version or active_version("car", root)
+    if version is None:
+        raise ValueError("No registered car model to update; run a full train first")
+    manifest = read_manifest("car", version, root)
+    if "category_thresholds" not in manifest:
+        raise ValueError(f"car model {version} has no category_thresholds in its manifest")
+    # a private in-memory copy: the forest is grown in place
+    return joblib.load(artifact_path("car", version, root)), manifest
+
+
+def update(
+    new_data: str,
+    add_trees: int = 50,
+    base_version: Optional[str] = None,
+    output: str = MODEL_PATH,
+    register: bool = True,
+    root: str = REGISTRY_DIR,
+) -> Dict[str, Any]:
+    """Grow the base model's forest with trees fit on a new data batch only.
+
+    The base version's category thresholds and fitted preprocessor are kept
+    frozen, so existing trees and new ones see identically encoded inputs.
+    """
+    start = time.perf_counter()
+    pipeline, manifest = load_base(base_version, root)
+    thresholds = manifest["category_thresholds"]
+    X, y, _ = load_data(new_data, thresholds=(thresholds["q1"], thresholds["q2"]))
+
+    forest = pipeline[-1]
+    missing = set(forest.classes_) - set(y)
+    if missing:
+        # warm_start refits classes_ from y, which would misalign the old trees
+        raise ValueError(f"New batch has no rows of class(es) {sorted(missing)}")
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    before = f1_score(y_test, pipeline.predict(X_test), average="macro")
+
+    base_trees = len(forest.estimators_)
+    class_weight = forest.class_weight
+    if class_weight == "balanced":
+        # same weighting, made explicit: sklearn warns about presets with warm_start
+        weights = compute_class_weight("balanced", classes=forest.classes_, y=y_train)
+        forest.set_params(class_weight=dict(zip(forest.classes_, weights)))
+    forest.set_params(warm_start=True, n_estimators=base_trees + add_trees)
+    fit_start = time.perf_counter()
+    forest.fit(pipeline[:-1].transform(X_train), y_train)
+    fit_seconds = time.perf_counter() - fit_start
+    forest.set_params(warm_start=False, class_weight=class_weight)
+    after = f1_score(y_test, pipeline.predict(X_test), average="macro")
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    save_model(pipeline, output)
+    update_seconds = time.perf_counter() - start
+    # chained updates compare against the last full retrain, not the last update
+    full_seconds = manifest.get("full_train_seconds", manifest.get("train_seconds"))
+    summary = {
+        "base_version": manifest["version"],
+        "new_rows": len(X),
+        "trees": f"{base_trees} -> {len(forest.estimators_)}",
+        "new_batch_f1_before": round(float(before), 4),
+        "new_batch_f1_after": round(float(after), 4),
+        "fit_seconds": round(fit_seconds, 2),
+        "update_seconds": round(update_seconds, 2),
+        "full_train_seconds": full_seconds,
+        "seconds_saved": round(full_seconds - update_seconds, 2) if full_seconds else None,
+    }
+    print(f"Update summary: {summary}")
+    print(f"✅ Model saved as {output}")
+    if register:
+        params = dict(manifest.get("params", {}), model__n_estimators=len(forest.estimators_))
+        registered = register_model(
+            "car",
+            pipeline,
+            metrics={"new_batch_f1_macro": float(after)},
+            extra={
+                "params": params,
+                "category_thresholds": thresholds,
+                "data_path": new_data,
+                "parent_version": manifest["version"],
+                "train_seconds": summary["update_seconds"],
+                "full_train_seconds": full_seconds,
+                "update_summary": summary,
+            },
+            activate=True,
+            root=root,
+        )
+        print(f"✅ Registered car model version {registered['version']}")
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train the car premium category model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--search", choices=["random", "halving"], default="random")
+    parser.add_argument("--n-iter", type=int, default=20, help="search candidates")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument(
+        "--no-resume", action="store_true", help="discard trials saved by an earlier run"
+    )
+    parser.add_argument(
+        "--cache-dir", default=CACHE_DIR, help="fit cache and trial log root; '' disables"
+    )
+    parser.add_argument("--no-register", action="store_true")
+    parser.add_argument(
+        "--update",
+        metavar="NEW_DATA",
+        help="grow the registered model with trees fit on this batch only",
+    )
+    parser.add_argument("--add-trees", type=int, default=50, help="trees added by --update")
+    parser.add_argument("--base-version", help="version to update (default: active)")
+    args = parser.parse_args(argv)
+
+    if args.update:
+        update(
+            args.update,
+            add_trees=args.add_trees,
+            base_version=args.base_version,
+            output=args.output,
+            register=not args.no_register,
+        )
+        return 0
+
+    train(
+        data_path=args.data,
+        output=args.output,
+        search=args.search,
+        n_iter=args.n_iter,
+        cv=args.cv,
+        n_jobs=args.n_jobs,
+        resume=not args.no_resume,
+        cache_dir=args.cache_dir or None,
+        register=not args.no_register,
+    )
+    return 0
+
 
-print("\n✅ Model saved as models/car_insurance_model.pkl")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Rendered-chart cache for the analytics pages.
+
+A chart is fully described by its spec (kind, summary name, colours,
+labels), the dataset version and the shared theme. Its PNG bytes are cached
+under a hash of those, in an in-process LRU (``CHART_CACHE_SIZE`` entries)
+backed by ``CHART_CACHE_DIR`` on disk, so reruns and fresh processes serve
+bytes instead of drawing. On a miss, the missing charts are drawn in a
+thread pool, each on its own ``Figure`` without pyplot's global state. The
+theme is applied to ``matplotlib.rcParams`` once, at import, so no thread
+mutates the shared rc while another is drawing.
+
+    images = render_charts(load_aggregates("car"), [spec, ...])
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import matplotlib
+import seaborn as sns
+from matplotlib.figure import Figure
+
+import analytics
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "64"))
+# empty disables the disk cache
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", os.path.join(".cache", "charts"))
+CHART_CACHE_MAX_FILES = int(os.getenv("CHART_CACHE_MAX_FILES", "500"))
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "4"))
+
+# the dark theme both analytics pages use
+THEME = {
+    "style": "darkgrid",
+    "rc": {
+        "figure.facecolor": "#0e1117",
+        "axes.facecolor": "#0e1117",
+        "grid.color": "#2a2e35",
+        "axes.labelcolor": "#e5e7eb",
+        "xtick.color": "#9ca3af",
+        "ytick.color": "#9ca3af",
+        "text.color": "#e5e7eb",
+    },
+}
+FIG_SIZE = (6, 3.5)
+DPI = 200
+
+# set once, before any render thread exists: set_theme rewrites the global
+# rcParams, which figures being drawn in other threads read
+sns.set_theme(**THEME)
+
+PLOTTERS = {
+    "histogram": analytics.plot_histogram,
+    "boxes": analytics.plot_boxes,
+    "counts": analytics.plot_counts,
+    "density": analytics.plot_density,
+}
+
+
+class ChartCache:
+    def __init__(
+        self,
+        maxsize: int = 64,
+        directory: Optional[str] = None,
+        max_files: int = 500,
+    ):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_files = max_files
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._data.get(key)
+            if png is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return png
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    png = f.read()
+            except OSError:
+                png = None
+            if png is not None:
+                self.disk_hits += 1
+                self._remember(key, png)
+                return png
+        self.misses += 1
+        return None
+
+    def put(self, key: str, png: bytes) -> None:
+        self._remember(key, png)
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(png)
+            os.replace(tmp, self._path(key))
+            self._prune()
+        except OSError as e:
+            logger.warning("Could not write chart cache %s: %s", key, e)
+
+    def _remember(self, key: str, png: bytes) -> None:
+        with self._lock:
+            self._data[key] = png
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _prune(self) -> None:
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".png")
+        ]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+chart_cache = ChartCache(CHART_CACHE_SIZE, CHART_CACHE_DIR or None, CHART_CACHE_MAX_FILES)
+
+
+def chart_key(version: str, spec: Dict[str, Any]) -> str:
+    payload = {
+        "version": version,
+        "schema": analytics.SCHEMA_VERSION,
+        "spec": spec,
+        "theme": THEME,
+        "fig_size": FIG_SIZE,
+        "dpi": DPI,
+        "matplotlib": matplotlib.__version__,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def render_chart(summary: Any, spec: Dict[str, Any]) -> bytes:
+    """PNG bytes of one chart drawn from a precomputed ``summary``."""
+    fig = Figure(figsize=FIG_SIZE)
+    ax = fig.subplots()
+    PLOTTERS[spec["kind"]](ax, summary, **spec.get("args", {}))
+    ax.set_xlabel(spec.get("xlabel", ""))
+    ax.set_ylabel(spec.get("ylabel", ""))
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def render_charts(aggregates: Dict[str, Any], specs: List[Dict[str, Any]]) -> List[bytes]:
+    """PNG bytes per spec, from the cache or drawn in parallel on a miss."""
+    version = f"{aggregates['dataset']}-{aggregates['version']}"
+    keys = [chart_key(version, spec) for spec in specs]
+    images = [chart_cache.get(key) for key in keys]
+    missing = [i for i, png in enumerate(images) if png is None]
+    if missing:
+        workers = max(1, min(CHART_RENDER_WORKERS, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rendered = pool.map(
+                lambda i: render_chart(aggregates[specs[i]["summary"]], specs[i]), missing
+            )
+            for i, png in zip(missing, rendered):
+                chart_cache.put(keys[i], png)
+                images[i] = png
+    return images
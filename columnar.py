@@ -0,0 +1,212 @@
+"""Columnar binary bodies for high-volume batch scoring.
+
+``/health/predict/columnar`` and ``/car/predict/columnar`` take one array per
+input field instead of a JSON list of objects, so no per-row Python objects
+are built:
+
+* ``application/x-npy``: a NumPy structured array saved with ``np.save``;
+* ``application/x-npz``: struct-of-arrays, one array per field (``np.savez``);
+* ``application/vnd.apache.arrow.stream``: an Arrow IPC stream (needs
+  ``pyarrow``).
+
+The checks each pydantic ``Field`` declares (type, ``gt``/``ge``/``lt``/``le``,
+``Literal`` choices) are read from the request model and applied to the whole
+column at once. Rows that fail keep their position in the response, with an
+``error`` message instead of a prediction.
+"""
+
+import io
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Tuple, get_args, get_origin
+
+import numpy as np
+import pandas as pd
+
+NPY = "application/x-npy"
+NPZ = "application/x-npz"
+ARROW = "application/vnd.apache.arrow.stream"
+FORMATS = (NPY, NPZ, ARROW)
+
+_KINDS = {int: "int", float: "float", bool: "bool", str: "str"}
+_OPS = {
+    "gt": (np.greater, ">"),
+    "ge": (np.greater_equal, ">="),
+    "lt": (np.less, "<"),
+    "le": (np.less_equal, "<="),
+}
+
+
+class ColumnarError(ValueError):
+    """Body that cannot be read as columns for the request model."""
+
+
+class UnsupportedFormat(ColumnarError):
+    pass
+
+
+# -----------------------
+# Field rules
+# -----------------------
+class ColumnRule(NamedTuple):
+    name: str
+    kind: str  # "int", "float", "bool" or "str"
+    bounds: Tuple[Tuple[str, Any], ...]  # (("gt", 0), ("lt", 120), ...)
+    choices: Optional[Tuple[str, ...]]
+
+
+def column_rules(schema) -> List[ColumnRule]:
+    """One :class:`ColumnRule` per input field of the pydantic model ``schema``."""
+    rules = []
+    for name, field in schema.model_fields.items():
+        annotation, choices = field.annotation, None
+        if get_origin(annotation) is Literal:
+            kind, choices = "str", tuple(get_args(annotation))
+        else:
+            kind = _KINDS[annotation]
+        bounds = tuple(
+            (op, getattr(meta, op))
+            for meta in field.metadata
+            for op in _OPS
+            if getattr(meta, op, None) is not None
+        )
+        rules.append(ColumnRule(name, kind, bounds, choices))
+    return rules
+
+
+def _coerce(rule: ColumnRule, values: np.ndarray):
+    """(typed values, bool mask of rows that are not of the rule's type)."""
+    kind = values.dtype.kind
+    n = len(values)
+    if rule.kind == "str":
+        if kind == "S":
+            values = np.char.decode(values, "utf-8")
+        if kind in "SU":
+            return values, np.zeros(n, dtype=bool)
+        if kind == "O":
+            return values, ~np.frompyfunc(lambda v: isinstance(v, str), 1, 1)(values).astype(bool)
+        return values, np.ones(n, dtype=bool)
+    if kind == "O":
+        try:
+            values = values.astype(np.float64)
+        except (TypeError, ValueError):
+            return np.zeros(n), np.ones(n, dtype=bool)
+        kind = "f"
+    if kind not in "biuf":
+        return np.zeros(n), np.ones(n, dtype=bool)
+    if rule.kind == "bool":
+        bad = ~np.isin(values, (0, 1))
+        return values.astype(bool), bad
+    if rule.kind == "int":
+        if kind == "f":
+            # lax like pydantic: 30.0 is a valid int, 30.5 / NaN are not
+            with np.errstate(invalid="ignore"):
+                bad = ~(np.isfinite(values) & (values == np.floor(values)))
+            return np.where(bad, 0, values).astype(np.int64), bad
+        return values.astype(np.int64, copy=False), np.zeros(n, dtype=bool)
+    return values.astype(np.float64, copy=False), np.zeros(n, dtype=bool)
+
+
+def validate_columns(
+    rules: List[ColumnRule], columns: Dict[str, np.ndarray]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Type and range check whole columns.
+
+    Returns (typed columns, per-row error strings); a row is valid when its
+    error is ``""``. Missing columns or ragged lengths raise ``ColumnarError``.
+    """
+    missing = [rule.name for rule in rules if rule.name not in columns]
+    if missing:
+        raise ColumnarError(f"Missing columns: {', '.join(missing)}")
+    lengths = {len(columns[rule.name]) for rule in rules}
+    if len(lengths) > 1:
+        raise ColumnarError("Columns have different lengths")
+    n = lengths.pop() if lengths else 0
+
+    errors = np.full(n, "", dtype=object)
+    typed = {}
+    for rule in rules:
+        values, bad = _coerce(rule, np.asarray(columns[rule.name]))
+        if bad.any():
+            errors[bad] += f"{rule.name}: not a valid {rule.kind}; "
+        for op, bound in rule.bounds:
+            compare, symbol = _OPS[op]
+            with np.errstate(invalid="ignore"):
+                fail = ~bad & ~compare(values, bound)
+            if fail.any():
+                errors[fail] += f"{rule.name}: must be {symbol} {bound}; "
+        if rule.choices is not None:
+            fail = ~bad & ~pd.Series(values).isin(rule.choices).to_numpy()
+            if fail.any():
+                errors[fail] += f"{rule.name}: must be one of {', '.join(rule.choices)}; "
+        typed[rule.name] = values
+    invalid = errors != ""
+    if invalid.any():
+        errors[invalid] = np.array([e[:-2] for e in errors[invalid]], dtype=object)
+    return typed, errors
+
+
+# -----------------------
+# Body (de)serialization
+# -----------------------
+def _require_arrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise UnsupportedFormat("Arrow bodies need pyarrow installed on the server")
+    return pa
+
+
+def read_columns(body: bytes, content_type: str) -> Dict[str, np.ndarray]:
+    """Column name -> array; NumPy formats are read as views of ``body``."""
+    try:
+        if content_type == NPY:
+            array = np.load(io.BytesIO(body), allow_pickle=False)
+            if array.dtype.names is None:
+                raise ColumnarError(".npy body must be a structured array")
+            return {name: array[name] for name in array.dtype.names}
+        if content_type == NPZ:
+            with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+                return {name: archive[name] for name in archive.files}
+        if content_type == ARROW:
+            pa = _require_arrow()
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+            return {name: table.column(name).to_numpy() for name in table.column_names}
+    except ColumnarError:
+        raise
+    except Exception as e:
+        raise ColumnarError(f"Could not read {content_type} body: {e}")
+    raise UnsupportedFormat(f"Unsupported content type {content_type!r}; use one of {FORMATS}")
+
+
+def write_columns(columns: Dict[str, np.ndarray], content_type: str) -> bytes:
+    out = io.BytesIO()
+    if content_type == ARROW:
+        pa = _require_arrow()
+        table = pa.table(columns)
+        with pa.ipc.new_stream(out, table.schema) as writer:
+            writer.write_table(table)
+        return out.getvalue()
+    # NumPy formats cannot hold object arrays without pickle
+    arrays = {
+        name: values.astype(str) if values.dtype.kind == "O" else values
+        for name, values in columns.items()
+    }
+    if content_type == NPZ:
+        np.savez(out, **arrays)
+    elif content_type == NPY:
+        n = len(next(iter(arrays.values()))) if arrays else 0
+        record = np.empty(n, dtype=[(name, a.dtype) for name, a in arrays.items()])
+        for name, values in arrays.items():
+            record[name] = values
+        np.save(out, record, allow_pickle=False)
+    else:
+        raise UnsupportedFormat(f"Unsupported response type {content_type!r}")
+    return out.getvalue()
+
+
+def response_type(accept: Optional[str], request_type: str) -> str:
+    """First supported type in ``Accept``; otherwise answer in the request's format."""
+    for part in (accept or "").split(","):
+        media = part.split(";")[0].strip()
+        if media in FORMATS:
+            return media
+    return request_type
@@ -0,0 +1,285 @@
+"""Shrink a trained forest to the smallest variant that keeps its accuracy.
+
+Candidates are built from the served pipeline with its fitted preprocessor
+kept as is:
+
+* ``subset``: the first N trees of the existing forest (no refit);
+* ``refit``:  a forest refit on the training split with N trees and a depth cap;
+* ``distill`` (``--distill``): like ``refit`` but trained on the original
+  model's labels for the training rows plus jittered copies of them.
+
+Each candidate is scored for macro-F1 on the held-out split the model was
+evaluated on, pickled size and single-row / batch latency. The smallest one
+whose F1 is within ``--tolerance`` of the original wins. A JSON report of the
+whole trade-off is written next to the compact artifact.
+
+    python compact_model.py car
+    python compact_model.py health --tolerance 0.02 --distill
+    python compact_model.py car --trees 25,50,100 --depths 8,12,none --register
+"""
+
+import argparse
+import copy
+import json
+import os
+import pickle
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from model_store import save_model
+
+MODELS = {
+    "health": "models/health_insurance_model.pkl",
+    "car": "models/car_insurance_model.pkl",
+}
+DEFAULT_TREES = (10, 25, 50, 100)
+DEFAULT_DEPTHS = (None, 16, 12, 10, 8, 6)
+
+
+# -----------------------
+# Held-out splits
+# -----------------------
+def health_split() -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    # same data, features and split as ml-model.ipynb
+    from features import health_features
+
+    df = pd.read_csv("insurance.csv")
+    X = health_features(df)
+    y = df["insurance_premium_category"]
+    return train_test_split(X, y, test_size=0.2, random_state=1)
+
+
+def car_split(thresholds: Optional[Dict[str, float]] = None):
+    # same split as car_ml_model.train, with the served model's thresholds
+    import car_ml_model
+
+    q = (thresholds["q1"], thresholds["q2"]) if thresholds else None
+    X, y, _ = car_ml_model.load_data(car_ml_model.DATA_PATH, thresholds=q)
+    return train_test_split(
+        X,
+        y,
+        test_size=car_ml_model.TEST_SIZE,
+        random_state=car_ml_model.RANDOM_STATE,
+        stratify=y,
+    )
+
+
+# -----------------------
+# Candidates
+# -----------------------
+def with_forest(pipeline: Pipeline, forest) -> Pipeline:
+    """``pipeline`` with its final estimator replaced; the preprocessor is shared."""
+    return Pipeline(pipeline.steps[:-1] + [(pipeline.steps[-1][0], forest)])
+
+
+def subset_forest(forest, n_trees: int):
+    small = copy.copy(forest)
+    small.estimators_ = forest.estimators_[:n_trees]
+    small.n_estimators = len(small.estimators_)
+    return small
+
+
+def jitter(X: pd.DataFrame, copies: int = 3, scale: float = 0.1, seed: int = 0) -> pd.DataFrame:
+    """``X`` plus noisy copies; numeric columns get N(0, scale * std) noise."""
+    rng = np.random.default_rng(seed)
+    frames = [X]
+    numeric = X.select_dtypes(include=["number"]).columns
+    for _ in range(copies):
+        noisy = X.copy()
+        for column in numeric:
+            std = float(X[column].std()) or 1.0
+            noisy[column] = X[column] + rng.normal(0, scale * std, len(X))
+        frames.append(noisy)
+    return pd.concat(frames, ignore_index=True)
+
+
+def model_size(pipeline: Pipeline) -> int:
+    return len(pickle.dumps(pipeline, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def node_count(forest) -> int:
+    return int(sum(tree.tree_.node_count for tree in forest.estimators_))
+
+
+def latency(pipeline: Pipeline, X: pd.DataFrame, repeats: int = 30) -> Dict[str, float]:
+    one = X.iloc[:1]
+    batch = X.sample(1000, replace=True, random_state=0)
+    pipeline.predict_proba(one)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        pipeline.predict_proba(one)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    pipeline.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "single_row_ms": round(float(np.median(times)) * 1000, 3),
+        "batch_1000_ms": round(batch_seconds * 1000, 3),
+    }
+
+
+def evaluate(pipeline: Pipeline, X_test, y_test) -> Dict[str, Any]:
+    forest = pipeline[-1]
+    return {
+        "trees": len(forest.estimators_),
+        "nodes": node_count(forest),
+        "max_depth_reached": int(max(t.tree_.max_depth for t in forest.estimators_)),
+        "size_bytes": model_size(pipeline),
+        "f1_macro": round(float(f1_score(y_test, pipeline.predict(X_test), average="macro")), 4),
+        **latency(pipeline, X_test),
+    }
+
+
+def compact(
+    pipeline: Pipeline,
+    split,
+    trees=DEFAULT_TREES,
+    depths=DEFAULT_DEPTHS,
+    tolerance: float = 0.01,
+    distill: bool = False,
+) -> Tuple[Pipeline, Dict[str, Any]]:
+    """Return (compact pipeline, report)."""
+    X_train, X_test, y_train, y_test = split
+    forest = pipeline[-1]
+    Xt_train = pipeline[:-1].transform(X_train)
+    if distill:
+        X_distill = jitter(X_train)
+        Xt_distill = pipeline[:-1].transform(X_distill)
+        y_distill = pipeline.predict(X_distill)
+
+    baseline = evaluate(pipeline, X_test, y_test)
+    baseline.update(
+        method="original", n_estimators=len(forest.estimators_), max_depth=forest.max_depth
+    )
+    candidates: List[Tuple[Dict[str, Any], Pipeline]] = [(baseline, pipeline)]
+
+    def add(method, n_trees, depth, small):
+        candidate = with_forest(pipeline, small)
+        result = evaluate(candidate, X_test, y_test)
+        result.update(method=method, n_estimators=n_trees, max_depth=depth)
+        candidates.append((result, candidate))
+        print(
+            f"  {method:8s} trees={n_trees:4d} depth={str(depth):5s} "
+            f"f1={result['f1_macro']:.4f} size={result['size_bytes'] / 1e6:6.2f}MB "
+            f"1-row={result['single_row_ms']:.2f}ms"
+        )
+
+    for n_trees in trees:
+        if n_trees < len(forest.estimators_):
+            add("subset", n_trees, forest.max_depth, subset_forest(forest, n_trees))
+        for depth in depths:
+            params = {"n_estimators": n_trees, "max_depth": depth, "warm_start": False}
+            add("refit", n_trees, depth, clone(forest).set_params(**params).fit(Xt_train, y_train))
+            if distill:
+                student = clone(forest).set_params(**params, class_weight=None)
+                add("distill", n_trees, depth, student.fit(Xt_distill, y_distill))
+
+    floor = baseline["f1_macro"] - tolerance
+    eligible = [(r, p) for r, p in candidates if r["f1_macro"] >= floor]
+    chosen, compact_pipeline = min(
+        eligible, key=lambda rp: (rp[0]["size_bytes"], rp[0]["single_row_ms"])
+    )
+    report = {
+        "tolerance": tolerance,
+        "f1_floor": round(floor, 4),
+        "baseline": baseline,
+        "chosen": chosen,
+        "size_reduction": round(1 - chosen["size_bytes"] / baseline["size_bytes"], 4),
+        "single_row_speedup": round(baseline["single_row_ms"] / chosen["single_row_ms"], 2),
+        "candidates": [r for r, _ in candidates],
+    }
+    return compact_pipeline, report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compact a trained forest")
+    parser.add_argument("name", choices=sorted(MODELS))
+    parser.add_argument("--model", help="artifact path (default: the served version)")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="allowed macro-F1 drop")
+    parser.add_argument("--trees", default=",".join(map(str, DEFAULT_TREES)))
+    parser.add_argument(
+        "--depths", default=",".join(str(d).lower() for d in DEFAULT_DEPTHS)
+    )
+    parser.add_argument("--distill", action="store_true")
+    parser.add_argument("--output", help="default: models/<name>_insurance_model.compact.pkl")
+    parser.add_argument(
+        "--register", action="store_true", help="add the compact model to the registry"
+    )
+    parser.add_argument("--activate", action="store_true", help="with --register")
+    args = parser.parse_args(argv)
+
+    from model_store import ModelStore
+    import model_registry
+
+    version, path = ModelStore(MODELS).resolve(args.name)
+    path = args.model or path
+    manifest = {}
+    if args.model is None and version != "legacy":
+        manifest = model_registry.read_manifest(args.name, version)
+    pipeline = joblib.load(path)
+    split = (
+        car_split(manifest.get("category_thresholds"))
+        if args.name == "car"
+        else health_split()
+    )
+    trees = [int(t) for t in args.trees.split(",")]
+    depths = [None if d.strip().lower() == "none" else int(d) for d in args.depths.split(",")]
+
+    print(f"Compacting {args.name} model {path}")
+    small, report = compact(pipeline, split, trees, depths, args.tolerance, args.distill)
+    report.update(name=args.name, source=path, source_version=version)
+
+    output = args.output or os.path.join("models", f"{args.name}_insurance_model.compact.pkl")
+    save_model(small, output)
+    report["output"] = output
+    if args.register:
+        chosen = report["chosen"]
+        step = small.steps[-1][0]
+        params = dict(
+            manifest.get("params", {}),
+            **{
+                f"{step}__n_estimators": chosen["n_estimators"],
+                f"{step}__max_depth": chosen["max_depth"],
+            },
+        )
+        extra = {"params": params, "compacted_from": version}
+        if "category_thresholds" in manifest:
+            extra["category_thresholds"] = manifest["category_thresholds"]
+        registered = model_registry.register_model(
+            args.name,
+            small,
+            metrics={"test_f1_macro": chosen["f1_macro"]},
+            extra={
+                **extra,
+                "compaction": {k: chosen[k] for k in ("method", "n_estimators", "max_depth")},
+            },
+            activate=args.activate,
+        )
+        report["registered_version"] = registered["version"]
+    report_path = os.path.splitext(output)[0] + ".report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    chosen, base = report["chosen"], report["baseline"]
+    print(
+        f"\nChosen: {chosen['method']} trees={chosen['n_estimators']} depth={chosen['max_depth']}"
+        f"  f1 {base['f1_macro']:.4f} -> {chosen['f1_macro']:.4f}"
+        f"  size {base['size_bytes'] / 1e6:.2f}MB -> {chosen['size_bytes'] / 1e6:.2f}MB"
+        f"  1-row {base['single_row_ms']:.2f}ms -> {chosen['single_row_ms']:.2f}ms"
+    )
+    print(f"Saved {output} and {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Shared, cached dataset loading for the Streamlit pages.
+
+Every page used to ``pd.read_csv`` the datasets on each rerun. Here each
+dataset is parsed once per file version with explicit dtypes (small ints,
+float32, categoricals), and the result is kept in ``st.cache_data``. The
+cache key includes the file's mtime and size, so replacing the CSV
+invalidates it without a restart. With ``pyarrow`` installed, the typed frame
+is also written to ``DATA_CACHE_DIR`` as Parquet. A fresh server process then
+reads that file instead of reparsing the CSV.
+
+    from data_access import load_dataset, health_analytics_frame
+    car_df = load_dataset("car")
+"""
+
+import glob
+import logging
+import os
+from typing import Callable, Dict, NamedTuple
+
+import pandas as pd
+import streamlit as st
+
+from features import bmi
+
+logger = logging.getLogger(__name__)
+
+# typed Parquet copies of the CSVs; empty disables the on-disk cache
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join(".cache", "datasets"))
+
+PREMIUM_CATEGORIES = pd.CategoricalDtype(["Low", "Medium", "High"], ordered=True)
+
+
+class Dataset(NamedTuple):
+    path: str
+    dtypes: Dict[str, object]
+    # post-parse fixups that dtype= cannot express
+    finish: Callable[[pd.DataFrame], pd.DataFrame] = lambda df: df
+
+
+def _finish_health(df: pd.DataFrame) -> pd.DataFrame:
+    df["insurance_premium_category"] = df["insurance_premium_category"].astype(
+        PREMIUM_CATEGORIES
+    )
+    return df
+
+
+DATASETS = {
+    "health": Dataset(
+        os.getenv("HEALTH_DATA", "insurance.csv"),
+        {
+            "age": "int16",
+            "weight": "float32",
+            "height": "float32",
+            "income_lpa": "float32",
+            "smoker": "bool",
+            "city": "category",
+            "occupation": "category",
+            "insurance_premium_category": "category",
+        },
+        _finish_health,
+    ),
+    "car": Dataset(
+        os.getenv("CAR_DATA", "Car_Dataset.csv"),
+        {
+            "Driver Age": "int16",
+            "Driver Experience": "int16",
+            "Previous Accidents": "int16",
+            "Annual Mileage (x1000 km)": "float32",
+            "Car Manufacturing Year": "int16",
+            "Car Age": "int16",
+            "Insurance Premium": "float32",
+        },
+    ),
+}
+
+
+def dataset_version(name: str) -> str:
+    """Cheap identity of the dataset file on disk (mtime + size)."""
+    stat = os.stat(DATASETS[name].path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _parquet_path(name: str, version: str) -> str:
+    return os.path.join(DATA_CACHE_DIR, f"{name}-{version}.parquet")
+
+
+def _read_parquet(path: str):
+    try:
+        return pd.read_parquet(path)
+    except ImportError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable dataset cache %s: %s", path, e)
+        return None
+
+
+def _write_parquet(df: pd.DataFrame, name: str, path: str) -> None:
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except ImportError:
+        return
+    except Exception as e:
+        logger.warning("Could not write dataset cache %s: %s", path, e)
+        return
+    # drop copies of older file versions
+    for old in glob.glob(os.path.join(DATA_CACHE_DIR, f"{name}-*.parquet")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _load(name: str, version: str) -> pd.DataFrame:
+    # ``version`` is only here to key the cache
+    dataset = DATASETS[name]
+    cached = _parquet_path(name, version) if DATA_CACHE_DIR else None
+    if cached and os.path.exists(cached):
+        df = _read_parquet(cached)
+        if df is not None:
+            return df
+    df = dataset.finish(pd.read_csv(dataset.path, dtype=dataset.dtypes))
+    if cached:
+        _write_parquet(df, name, cached)
+    return df
+
+
+def load_dataset(name: str) -> pd.DataFrame:
+    """Typed dataset, reparsed only when the file on disk changes."""
+    return _load(name, dataset_version(name))
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _health_analytics(version: str) -> pd.DataFrame:
+    df = _load("health", version)
+    df["bmi"] = bmi(df["weight"], df["height"]).astype("float32")
+    return df
+
+
+def health_analytics_frame() -> pd.DataFrame:
+    """The health dataset plus the derived ``bmi`` column."""
+    return _health_analytics(dataset_version("health"))
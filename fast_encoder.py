@@ -0,0 +1,252 @@
+"""Pandas-free feature encoder compiled from a fitted sklearn pipeline.
+
+``ColumnTransformer.transform`` on a one-row DataFrame spends most of its time
+in DataFrame construction and column dispatch rather than arithmetic. At
+startup we read the learned imputer statistics, scaler means/scales and
+one-hot categories out of the fitted preprocessor and encode plain dicts
+(column name -> value) straight into a float64 row laid out exactly like the
+transformer output.
+
+Run ``python fast_encoder.py`` to check parity against
+``pipeline[:-1].transform`` on both bundled CSVs, plus unseen-category and
+missing-value rows; it exits non-zero on any mismatch. The repo has no
+pytest suite, so this command is the encoder's parity test.
+"""
+
+import math
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class _CategoricalColumn:
+    __slots__ = ("name", "fill", "offsets", "strict")
+
+    def __init__(self, name, fill, offsets, strict):
+        self.name = name
+        self.fill = fill
+        self.offsets = offsets
+        self.strict = strict
+
+
+class CompiledEncoder:
+    """Encode feature dicts into the fitted ColumnTransformer's output layout."""
+
+    def __init__(self, n_features_out: int, numeric, categorical):
+        self.n_features_out = n_features_out
+        # numeric columns are handled as one vectorised block
+        self.numeric_names = [c[0] for c in numeric]
+        self.numeric_out = np.array([c[1] for c in numeric], dtype=np.intp)
+        self.numeric_fill = np.array([c[2] for c in numeric], dtype=np.float64)
+        self.numeric_mean = np.array([c[3] for c in numeric], dtype=np.float64)
+        self.numeric_scale = np.array([c[4] for c in numeric], dtype=np.float64)
+        self.categorical: List[_CategoricalColumn] = categorical
+        self._local = threading.local()
+
+    def _buffer(self) -> np.ndarray:
+        buf = getattr(self._local, "row", None)
+        if buf is None:
+            buf = np.zeros((1, self.n_features_out), dtype=np.float64)
+            self._local.row = buf
+        return buf
+
+    def _fill_row(self, row: Mapping[str, Any], out: np.ndarray) -> None:
+        out[:] = 0.0
+        if self.numeric_names:
+            values = np.array(
+                [row[name] for name in self.numeric_names], dtype=np.float64
+            )
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = self.numeric_fill[missing]
+            out[self.numeric_out] = (values - self.numeric_mean) / self.numeric_scale
+        for col in self.categorical:
+            value = row[col.name]
+            if _is_missing(value):
+                value = col.fill
+            idx = col.offsets.get(value)
+            if idx is not None:
+                out[idx] = 1.0
+            elif col.strict:
+                raise ValueError(f"Found unknown category {value!r} in {col.name!r}")
+
+    def encode(self, row: Mapping[str, Any], out: Optional[np.ndarray] = None):
+        """Encode one row into a ``(1, n_features_out)`` array.
+
+        Without ``out`` a per-thread preallocated buffer is reused, so the
+        result is only valid until the next ``encode`` call on that thread.
+        """
+        if out is None:
+            out = self._buffer()
+        self._fill_row(row, out[0])
+        return out
+
+    def encode_many(self, rows: Iterable[Mapping[str, Any]]) -> np.ndarray:
+        rows = list(rows)
+        out = np.zeros((len(rows), self.n_features_out), dtype=np.float64)
+        for i, row in enumerate(rows):
+            self._fill_row(row, out[i])
+        return out
+
+
+def _steps(transformer) -> list:
+    if isinstance(transformer, Pipeline):
+        return [step for _, step in transformer.steps if step not in (None, "passthrough")]
+    return [transformer]
+
+
+def compile_encoder(pipeline) -> CompiledEncoder:
+    """Build a :class:`CompiledEncoder` from a fitted ``Pipeline``.
+
+    Supports a ``ColumnTransformer`` made of ``SimpleImputer``,
+    ``StandardScaler`` and dense ``OneHotEncoder`` steps (the layouts produced
+    by ``car_ml_model.py`` and the health notebook). Anything else raises
+    ``NotImplementedError`` so callers can fall back to the sklearn path.
+    """
+    ct = pipeline[0] if isinstance(pipeline, Pipeline) else pipeline
+    if not isinstance(ct, ColumnTransformer):
+        raise NotImplementedError(f"Unsupported preprocessor {type(ct).__name__}")
+
+    numeric, categorical = [], []
+    n_out = 0
+    for name, transformer, columns in ct.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        columns = list(columns)
+        if isinstance(columns[0], (int, np.integer)):
+            columns = [ct.feature_names_in_[c] for c in columns]
+        start = ct.output_indices_[name].start
+        steps = [] if transformer == "passthrough" else _steps(transformer)
+
+        fill = [np.nan] * len(columns)
+        mean = [0.0] * len(columns)
+        scale = [1.0] * len(columns)
+        encoder = None
+        for step in steps:
+            if encoder is not None:
+                raise NotImplementedError("Steps after OneHotEncoder are not supported")
+            if isinstance(step, SimpleImputer):
+                if step.add_indicator:
+                    raise NotImplementedError("SimpleImputer(add_indicator=True)")
+                if not (isinstance(step.missing_values, float) and math.isnan(step.missing_values)):
+                    raise NotImplementedError("SimpleImputer with non-NaN missing_values")
+                fill = list(step.statistics_)
+            elif isinstance(step, StandardScaler):
+                if step.mean_ is not None:
+                    mean = [m if step.with_mean else 0.0 for m in step.mean_]
+                if step.scale_ is not None:
+                    scale = list(step.scale_)
+            elif isinstance(step, OneHotEncoder):
+                if step.drop is not None or step.max_categories is not None:
+                    raise NotImplementedError("OneHotEncoder with drop/max_categories")
+                if step.min_frequency is not None:
+                    raise NotImplementedError("OneHotEncoder with min_frequency")
+                encoder = step
+            else:
+                raise NotImplementedError(f"Unsupported step {type(step).__name__}")
+
+        if encoder is None:
+            for j, column in enumerate(columns):
+                numeric.append((column, start + j, fill[j], mean[j], scale[j]))
+            n_out = max(n_out, start + len(columns))
+            continue
+
+        if any(m != 0.0 or s != 1.0 for m, s in zip(mean, scale)):
+            raise NotImplementedError("StandardScaler before OneHotEncoder")
+        offset = start
+        for j, column in enumerate(columns):
+            cats = encoder.categories_[j]
+            offsets: Dict[Any, int] = {}
+            for k, cat in enumerate(cats):
+                offsets[cat.item() if isinstance(cat, np.generic) else cat] = offset + k
+            offset += len(cats)
+            column_fill = fill[j]
+            if isinstance(column_fill, np.generic):
+                column_fill = column_fill.item()
+            categorical.append(
+                _CategoricalColumn(
+                    column,
+                    None if _is_missing(column_fill) else column_fill,
+                    offsets,
+                    encoder.handle_unknown == "error",
+                )
+            )
+        n_out = max(n_out, offset)
+
+    if ct.remainder not in ("drop",) and "remainder" in ct.output_indices_:
+        rem = ct.output_indices_["remainder"]
+        if rem.stop > rem.start:
+            raise NotImplementedError("ColumnTransformer remainder columns")
+    return CompiledEncoder(n_out, numeric, categorical)
+
+
+# =======================
+# PARITY CHECK
+# =======================
+def check_parity(pipeline, frame, atol: float = 1e-9) -> float:
+    """Compare the compiled encoder with ``pipeline[:-1].transform``.
+
+    Returns the max absolute difference and raises ``AssertionError`` when it
+    exceeds ``atol`` or the row-wise and batch encodings disagree.
+    """
+    encoder = compile_encoder(pipeline)
+    expected = pipeline[:-1].transform(frame)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    records = frame.to_dict(orient="records")
+    batch = encoder.encode_many(records)
+    single = np.vstack([encoder.encode(r).copy() for r in records])
+    diff = float(np.abs(batch - expected).max()) if len(records) else 0.0
+    assert batch.shape == expected.shape, (batch.shape, expected.shape)
+    assert diff <= atol, f"max abs diff {diff}"
+    assert np.array_equal(batch, single), "encode and encode_many disagree"
+    return diff
+
+
+def bundled_frames():
+    """(name, model path, pipeline input frame) for the bundled datasets."""
+    import pandas as pd
+
+    from features import health_features
+
+    health = health_features(pd.read_csv("insurance.csv"))
+    # unseen categories must encode to all-zero blocks, like handle_unknown="ignore"
+    health.loc[len(health)] = [5.0, "astronaut", 22.0, "Adult", "low", 9]
+
+    car = pd.read_csv("Car_Dataset.csv").drop(columns=["Insurance Premium"])
+    car = car.astype(float)
+    # missing numerics go through the fitted median imputer
+    car.loc[len(car)] = [np.nan, 3.0, np.nan, 12.0, 2015.0, np.nan]
+    return [
+        ("health", "models/health_insurance_model.pkl", health),
+        ("car", "models/car_insurance_model.pkl", car),
+    ]
+
+
+def main() -> int:
+    import joblib
+
+    failed = False
+    for name, path, frame in bundled_frames():
+        try:
+            diff = check_parity(joblib.load(path), frame)
+        except AssertionError as e:
+            failed = True
+            print(f"{name} FAILED: {e}")
+        else:
+            print(f"{name} max abs diff: {diff}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
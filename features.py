@@ -0,0 +1,354 @@
+"""Health feature engineering shared by training, the API, bulk scoring and analytics.
+
+Every function takes scalars or array-likes (NumPy arrays, pandas Series)
+and is vectorized with ``np.select`` and hashed lookups, so one
+implementation serves a single API request and a million-row frame alike.
+City tiers come from ``city_tiers.csv`` through :class:`CityTierIndex`. Heights are in
+metres, as in ``insurance.csv``; the API collects feet and passes
+``height_unit="ft"``.
+
+    python features.py check          # parity with the notebook's apply() code
+    python features.py bench --rows 1000000
+
+``check`` is the parity test (the repo has no pytest suite): it exits 1 if
+any column differs on ``insurance.csv`` or on the synthetic edge-case frame.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# city -> tier data; cities missing from it are tier 3
+CITY_TIERS_FILE = os.getenv(
+    "CITY_TIERS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "city_tiers.csv")
+)
+DEFAULT_TIER = 3
+
+# multiply a height by this to get metres
+HEIGHT_UNITS = {"m": 1.0, "ft": 0.3048}
+
+# health pipeline input columns, in training order
+HEALTH_COLUMNS = ["income_lpa", "occupation", "bmi", "age_group", "lifestyle_risk", "city_tier"]
+
+
+def bmi(weight, height, height_unit: str = "m"):
+    height = np.asarray(height, dtype=float) * HEIGHT_UNITS[height_unit]
+    return np.asarray(weight, dtype=float) / height**2
+
+
+# np.select picks a code per row and the labels are gathered by index, which
+# is several times faster than selecting between string arrays
+AGE_GROUPS = np.array(["Young", "Adult", "Middle_Aged", "Senior"], dtype=object)
+LIFESTYLE_RISKS = np.array(["high", "medium", "low"], dtype=object)
+
+
+def age_group(age) -> np.ndarray:
+    age = np.asarray(age, dtype=float)
+    return AGE_GROUPS[np.select([age < 25, age < 45, age < 60], [0, 1, 2], 3)]
+
+
+def lifestyle_risk(smoker, bmi) -> np.ndarray:
+    smoker = as_bool(smoker)
+    bmi = np.asarray(bmi, dtype=float)
+    return LIFESTYLE_RISKS[np.select([smoker & (bmi > 30), smoker & (bmi > 27)], [0, 1], 2)]
+
+
+def normalize_city(name: Any) -> str:
+    """Case-, whitespace- and hyphen-insensitive key for a city name."""
+    return " ".join(str(name).replace("-", " ").casefold().split())
+
+
+class CityTierIndex:
+    """Hashed city -> tier lookup over normalized names and their aliases.
+
+    Lookups that miss the index fall back to tier 3 and are counted, with
+    the most frequent unknown names kept for ``stats()``, so spelling gaps
+    in ``city_tiers.csv`` show up instead of silently changing the tier.
+    """
+
+    def __init__(self, tiers: Dict[str, int], canonical: Dict[str, int], source: str = ""):
+        self.tiers = tiers
+        self.canonical = canonical
+        self.source = source
+        self.lookups = 0
+        self.fallbacks = 0
+        self.unknown: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = CITY_TIERS_FILE) -> "CityTierIndex":
+        """Read ``city,tier,aliases`` rows; aliases are ``|``-separated."""
+        tiers, canonical = {}, {}
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                tier = int(row["tier"])
+                canonical[row["city"].strip()] = tier
+                for name in [row["city"], *(row.get("aliases") or "").split("|")]:
+                    if name.strip():
+                        tiers[normalize_city(name)] = tier
+        return cls(tiers, canonical, path)
+
+    def cities(self, tier: int) -> List[str]:
+        return [city for city, t in self.canonical.items() if t == tier]
+
+    def representatives(self, city: Optional[str] = None) -> Dict[int, str]:
+        """One canonical city per tier, by tier; ``city`` stands in for its own
+        tier, so an unlisted city adds the default tier. Nothing is counted."""
+        picks: Dict[int, str] = {}
+        for name, tier in self.canonical.items():
+            picks.setdefault(tier, name)
+        if city:
+            picks[self.tiers.get(normalize_city(city), DEFAULT_TIER)] = city
+        return dict(sorted(picks.items()))
+
+    def tier(self, city: Any) -> int:
+        tier = self.tiers.get(normalize_city(city))
+        self._count(1, {city: 1} if tier is None else {})
+        return DEFAULT_TIER if tier is None else tier
+
+    def lookup(self, city) -> np.ndarray:
+        """Vectorized :meth:`tier` over a Series or array of names."""
+        # normalize and probe each distinct name once, then broadcast by code
+        codes, uniques = pd.factorize(
+            np.asarray(city, dtype=object).ravel(), use_na_sentinel=False
+        )
+        found = np.array(
+            [self.tiers.get(normalize_city(name), 0) for name in uniques], dtype=np.int64
+        )
+        counts = np.bincount(codes, minlength=len(uniques))
+        self._count(
+            len(codes),
+            {name: int(n) for name, tier, n in zip(uniques, found, counts) if not tier},
+        )
+        tiers = found[codes]
+        return np.where(tiers == 0, DEFAULT_TIER, tiers)
+
+    def _count(self, n: int, unknown: Dict[Any, int]) -> None:
+        with self._lock:
+            self.lookups += n
+            if unknown:
+                self.fallbacks += sum(unknown.values())
+                self.unknown.update({str(name): count for name, count in unknown.items()})
+                if len(self.unknown) > 1000:
+                    self.unknown = Counter(dict(self.unknown.most_common(100)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "cities": len(self.canonical),
+            "names": len(self.tiers),
+            "lookups": self.lookups,
+            "tier3_fallbacks": self.fallbacks,
+            "top_unknown": dict(self.unknown.most_common(10)),
+        }
+
+
+_city_tiers: Optional[CityTierIndex] = None
+_city_tiers_lock = threading.Lock()
+
+
+def city_tiers() -> CityTierIndex:
+    """Process-wide index, loaded from ``CITY_TIERS_FILE`` on first use."""
+    global _city_tiers
+    if _city_tiers is None:
+        with _city_tiers_lock:
+            if _city_tiers is None:
+                _city_tiers = CityTierIndex.load()
+    return _city_tiers
+
+
+def city_tier(city):
+    """Tier for one city name (int), or an array of tiers for array-likes."""
+    index = city_tiers()
+    if isinstance(city, str):
+        return index.tier(city)
+    return index.lookup(city).reshape(np.shape(city))
+
+
+def as_bool(values) -> np.ndarray:
+    """Booleans from bools, 0/1 or "True"/"false"/"yes" strings (CSV input)."""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in "iuf":
+        return values != 0
+    return np.isin(np.char.lower(values.astype(str)), ["true", "1", "yes"])
+
+
+def health_features(df: pd.DataFrame, height_unit: str = "m") -> pd.DataFrame:
+    """Health pipeline input for a frame with the ``insurance.csv`` columns."""
+    body_mass = bmi(df["weight"], df["height"], height_unit)
+    return pd.DataFrame(
+        {
+            "income_lpa": df["income_lpa"].to_numpy(dtype=float),
+            "occupation": df["occupation"],
+            "bmi": body_mass,
+            "age_group": age_group(df["age"]),
+            "lifestyle_risk": lifestyle_risk(df["smoker"], body_mass),
+            "city_tier": city_tier(df["city"]),
+        },
+        index=df.index,
+        copy=False,
+    )
+
+
+# -----------------------
+# Parity check and benchmark
+# -----------------------
+# city tiers from ml-model.ipynb; the oracle that city_tiers.csv must reproduce
+TIER_1 = [
+    "Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata", "Hyderabad", "Pune",
+    "Dhaka", "Sylhet", "Chattogram",
+]
+TIER_2 = [
+    "Khulna", "Rajshahi", "Barishal", "Rangpur", "Mymensingh", "Comilla",
+    "Jaipur", "Chandigarh", "Indore", "Lucknow", "Patna", "Ranchi",
+    "Visakhapatnam", "Coimbatore", "Bhopal", "Nagpur", "Vadodara", "Surat",
+    "Rajkot", "Jodhpur", "Raipur", "Amritsar", "Varanasi", "Agra", "Dehradun",
+    "Mysore", "Jabalpur", "Guwahati", "Thiruvananthapuram", "Ludhiana",
+    "Nashik", "Allahabad", "Udaipur", "Aurangabad", "Hubli", "Belgaum", "Salem",
+    "Vijayawada", "Tiruchirappalli", "Bhavnagar", "Gwalior", "Dhanbad",
+    "Bareilly", "Aligarh", "Gaya", "Kozhikode", "Warangal", "Kolhapur",
+    "Bilaspur", "Jalandhar", "Noida", "Guntur", "Asansol", "Siliguri",
+]
+# names the notebook lists miss on purpose (aliases, spellings), with the
+# tier the index must give them; anything else must match the lists
+ALIAS_TIERS = {
+    "Bengaluru": 1,
+    "chittagong": 1,
+    "  new  delhi ": 1,
+    "BOMBAY": 1,
+    "Calcutta": 1,
+    "Barisal": 2,
+    "Vizag": 2,
+    "benares": 2,
+    "trichy": 2,
+    "Prayagraj": 2,
+}
+
+
+def _reference_features(df: pd.DataFrame) -> pd.DataFrame:
+    # the row-wise apply() code from ml-model.ipynb, kept as the parity oracle
+    def _age_group(age):
+        if age < 25:
+            return "Young"
+        elif age < 45:
+            return "Adult"
+        elif age < 60:
+            return "Middle_Aged"
+        else:
+            return "Senior"
+
+    def _city_tier(city):
+        if city in TIER_1:
+            return 1
+        elif city in TIER_2:
+            return 2
+        else:
+            return 3
+
+    def _lifestyle_risk(row):
+        if row["smoker"] and row["bmi"] > 30:
+            return "high"
+        elif row["smoker"] and row["bmi"] > 27:
+            return "medium"
+        else:
+            return "low"
+
+    new_df = df.copy()
+    new_df["bmi"] = new_df["weight"] / (new_df["height"] ** 2)
+    new_df["age_group"] = new_df["age"].apply(_age_group)
+    new_df["lifestyle_risk"] = new_df.apply(_lifestyle_risk, axis=1)
+    new_df["city_tier"] = new_df["city"].apply(_city_tier)
+    # aliases resolve through the index; the notebook lists would say tier 3
+    aliases = new_df["city"].isin(ALIAS_TIERS)
+    new_df.loc[aliases, "city_tier"] = new_df.loc[aliases, "city"].map(ALIAS_TIERS)
+    return new_df[HEALTH_COLUMNS]
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Random ``insurance.csv``-shaped frame, including boundary ages and BMIs."""
+    rng = np.random.default_rng(seed)
+    # the notebook's names, aliases and odd spellings, and unknown cities
+    extra = list(ALIAS_TIERS) + ["Tangail", "Gazipur", "Kota"]
+    cities = np.array(TIER_1 + TIER_2 + extra, dtype=object)
+    occupations = np.array(
+        ["retired", "freelancer", "student", "government_job", "business_owner",
+         "unemployed", "private_job"],
+        dtype=object,
+    )
+    height = rng.uniform(1.4, 2.0, rows).round(2)
+    # hit the 27/30 BMI edges exactly on some rows
+    bmi_target = rng.choice([27.0, 30.0, 0.0], rows, p=[0.05, 0.05, 0.9])
+    weight = np.where(bmi_target > 0, bmi_target * height**2, rng.uniform(40, 130, rows))
+    return pd.DataFrame(
+        {
+            "age": rng.integers(18, 80, rows),
+            "weight": weight,
+            "height": height,
+            "income_lpa": rng.uniform(1, 50, rows).round(2),
+            "smoker": rng.random(rows) < 0.3,
+            "city": rng.choice(cities, rows),
+            "occupation": rng.choice(occupations, rows),
+        }
+    )
+
+
+def check_parity(df: pd.DataFrame) -> Dict[str, int]:
+    """Mismatching rows per column between the vectorized and apply() features."""
+    ours, ref = health_features(df), _reference_features(df)
+    mismatches = {}
+    for column in HEALTH_COLUMNS:
+        if column in ("bmi", "income_lpa"):
+            equal = np.isclose(ours[column], ref[column], rtol=0, atol=1e-12)
+        else:
+            equal = ours[column].to_numpy() == ref[column].to_numpy()
+        mismatches[column] = int((~equal).sum())
+    return mismatches
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Health feature engineering")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check = sub.add_parser("check", help="parity with the notebook's apply() code")
+    check.add_argument("--rows", type=int, default=100_000)
+    bench = sub.add_parser("bench", help="vectorized vs apply() timing")
+    bench.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        failed = False
+        frames = [("insurance.csv", pd.read_csv("insurance.csv"))]
+        frames.append((f"synthetic x{args.rows}", synthetic_frame(args.rows)))
+        for label, df in frames:
+            mismatches = check_parity(df)
+            failed |= any(mismatches.values())
+            print(f"{label}: {mismatches}")
+        return 1 if failed else 0
+
+    df = synthetic_frame(args.rows)
+    vectorized = _timed(lambda: health_features(df))
+    reference = _timed(lambda: _reference_features(df))
+    print(
+        f"{args.rows:,} rows: vectorized {vectorized:.3f}s, apply {reference:.3f}s "
+        f"({reference / vectorized:.0f}x)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
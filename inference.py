@@ -0,0 +1,93 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# CarUserInput field -> car pipeline column
+CAR_COLUMNS = {
+    "driver_age": "Driver Age",
+    "driver_experience": "Driver Experience",
+    "previous_accidents": "Previous Accidents",
+    "annual_mileage_x1000": "Annual Mileage (x1000 km)",
+    "car_manufacturing_year": "Car Manufacturing Year",
+    "car_age": "Car Age",
+}
+
+
+def predict_with_confidence(model, X):
+    """Score ``X`` with a single ``predict_proba`` pass.
+
+    The label is the argmax over ``model.classes_``, which is exactly what
+    ``RandomForestClassifier.predict`` does internally, so callers no longer
+    need a second ``predict`` call (and a second preprocessing + forest walk).
+    Returns ``(labels, confidences)`` as arrays with one entry per row.
+    """
+    proba = np.asarray(model.predict_proba(X))
+    best = proba.argmax(axis=1)
+    return model.classes_[best], proba[np.arange(len(best)), best]
+
+
+def predict_with_probabilities(model, X):
+    """``predict_with_confidence`` plus every class's probability column, as
+    ``(labels, confidences, {class: probabilities})`` from the same pass."""
+    proba = np.asarray(model.predict_proba(X))
+    best = proba.argmax(axis=1)
+    columns = {str(c): proba[:, i] for i, c in enumerate(model.classes_)}
+    return model.classes_[best], proba[np.arange(len(best)), best], columns
+
+
+ENGINES = ("sklearn", "flat", "auto")
+
+# the flat forest wins at small batch sizes; sklearn's per-tree loop
+# amortises better on large batches
+FLAT_AUTO_MAX_ROWS = 64
+
+
+def resolve_engine(engine, n_rows, forest=None):
+    if engine == "auto":
+        if forest is not None and n_rows <= FLAT_AUTO_MAX_ROWS:
+            return "flat"
+        return "sklearn"
+    if engine == "flat" and forest is None:
+        raise ValueError("Flat forest engine is not available for this model")
+    return engine
+
+
+def score_rows(model, rows, encoder=None, forest=None, engine="sklearn", timings=None):
+    """Score a list of feature dicts (pipeline column name -> value).
+
+    With a compiled encoder (see ``fast_encoder``) the rows are encoded
+    straight into NumPy and only the final estimator runs; otherwise they go
+    through a DataFrame and the sklearn preprocessor. ``engine`` picks the
+    final estimator: sklearn's forest, the ``flat_forest.FlatForest`` export,
+    or ``"auto"`` to choose by batch size. When a ``timings`` dict is given,
+    the seconds spent in ``"preprocess"`` and ``"inference"`` are stored in it.
+
+    ``rows`` may also be a DataFrame with the pipeline columns (columnar
+    requests); it goes straight to the vectorized sklearn preprocessor, which
+    beats the row-at-a-time encoder on large batches.
+    """
+    engine = resolve_engine(engine, len(rows), forest)
+    estimator = forest if engine == "flat" else model[-1]
+    return score_with(model[:-1], estimator, rows, encoder, timings)
+
+
+def score_with(preprocessor, estimator, rows, encoder=None, timings=None, probabilities=False):
+    """``score_rows`` with the preprocessing steps (``model[:-1]``) and the final
+    estimator given apart, so the flat engine never needs the sklearn forest.
+    ``probabilities`` adds the per-class columns (``predict_with_probabilities``)."""
+    start = time.perf_counter()
+    if isinstance(rows, pd.DataFrame):
+        X = preprocessor.transform(rows)
+    elif encoder is not None:
+        X = encoder.encode(rows[0]) if len(rows) == 1 else encoder.encode_many(rows)
+    else:
+        # same two steps Pipeline.predict_proba runs, split so each can be timed
+        X = preprocessor.transform(pd.DataFrame(rows))
+    encoded = time.perf_counter()
+    predict = predict_with_probabilities if probabilities else predict_with_confidence
+    result = predict(estimator, X)
+    if timings is not None:
+        timings["preprocess"] = encoded - start
+        timings["inference"] = time.perf_counter() - encoded
+    return result
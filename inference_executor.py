@@ -0,0 +1,276 @@
+"""Bounded executor for CPU-bound model scoring behind async endpoints.
+
+Forest inference holds the GIL for most of its runtime. Running it on
+FastAPI's shared default threadpool gives no control over concurrency, so
+under load spikes ``/health`` and other cheap routes queue behind it. This
+executor owns a dedicated pool with a fixed number of workers. It has a
+bounded number of admitted requests, and rejects the rest immediately with
+:class:`ExecutorSaturated` (mapped to 503 + Retry-After). Callers also get a
+per-request timeout.
+
+``kind="process"`` runs scoring in worker processes that preload their own
+:class:`model_store.ModelStore` (the flat forest arrays are memory-mapped, so
+those pages are shared), which takes inference off the server's GIL entirely.
+Workers track the served artifact by its sha256. After a hot swap or rollback,
+:meth:`InferenceExecutor.refresh` replaces the pool with workers that have
+already loaded and warmed the new version.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from inference import resolve_engine, score_with
+from model_store import LoadedModel, ModelStore
+from profiler import profile_call
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+# -----------------------
+# Process workers
+# -----------------------
+_worker_store: Optional[ModelStore] = None
+_warm_barrier = None
+# (name, sha256) the worker reloaded for and still could not find on disk
+_missing: Set[Tuple[str, str]] = set()
+
+# seconds a new process pool may take to load and warm every worker
+WARM_TIMEOUT = 120.0
+
+
+def _init_worker(store_config: Dict[str, Any], targets: Dict[str, str], barrier) -> None:
+    global _worker_store, _warm_barrier
+    _worker_store = ModelStore(**store_config)
+    for name in _worker_store.paths:
+        if name in targets:
+            # swap() loads and warms without touching the registry's ACTIVE
+            _worker_store.swap(name, targets[name], activate=False)
+        else:
+            loaded = _worker_store.load(name)
+            if loaded is not None:
+                _worker_store.warm(loaded)
+    _warm_barrier = barrier
+
+
+def _wait_warm() -> int:
+    # every warm-up job blocks here until all workers have initialized, so
+    # each one lands on a different worker
+    _warm_barrier.wait(WARM_TIMEOUT)
+    return os.getpid()
+
+
+def _score_in_worker(
+    name: str,
+    version: str,
+    sha256: str,
+    rows,
+    engine: str,
+    profile: bool = False,
+    probabilities: bool = False,
+):
+    loaded = _worker_store.get(name)
+    if loaded is None or loaded.info.get("sha256") != sha256:
+        # missed a pool refresh (the job raced a swap); follow the server.
+        # Keyed on the artifact hash: a legacy reload keeps the version string
+        if (name, sha256) in _missing:
+            raise RuntimeError(f"{name} model {version} ({sha256[:12]}) is not on disk")
+        loaded = _worker_store.swap(name, version, activate=False)
+        if loaded.info.get("sha256") != sha256:
+            _missing.add((name, sha256))
+            raise RuntimeError(f"{name} model {version} ({sha256[:12]}) is not on disk")
+    return _score_in_thread(loaded, rows, engine, profile, probabilities)
+
+
+def _score_in_thread(
+    loaded: LoadedModel,
+    rows,
+    engine: str,
+    profile: bool = False,
+    probabilities: bool = False,
+):
+    # stage timings (and profiler stats) travel back with the result so
+    # process workers report them too
+    timings: Dict[str, float] = {}
+    engine = resolve_engine(engine, len(rows), loaded.forest)
+    # the sklearn estimator is read from disk only when this engine needs it
+    estimator = loaded.forest if engine == "flat" else loaded.pipeline[-1]
+    args = (loaded.preprocessor, estimator, rows, loaded.encoder, timings, probabilities)
+    if profile:
+        scored, stats = profile_call(score_with, *args)
+    else:
+        scored, stats = score_with(*args), None
+    return scored, timings, stats
+
+
+class InferenceExecutor:
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_pending: int = 64,
+        timeout: Optional[float] = 10.0,
+        retry_after: float = 1.0,
+        store_config: Optional[Dict[str, Any]] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError("executor kind must be 'thread' or 'process'")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.store_config = store_config or {}
+        self._pool: Optional[Executor] = None
+        self._refresh_lock = threading.Lock()
+        # only touched from the event loop thread, so no lock is needed
+        self.pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.completed = 0
+
+    def _process_pool(self, targets: Dict[str, str]) -> ProcessPoolExecutor:
+        """A process pool whose workers have all loaded and warmed ``targets``
+        (name -> version; other models at their registry version)."""
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(self.max_workers)
+        pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.store_config, targets, barrier),
+        )
+        # workers spawn on demand, one per job while none is idle
+        jobs = [pool.submit(_wait_warm) for _ in range(self.max_workers)]
+        try:
+            for job in jobs:
+                job.result(timeout=WARM_TIMEOUT)
+        except Exception as e:
+            logger.warning("Inference workers did not all warm up: %s", e)
+        return pool
+
+    def refresh(self, targets: Dict[str, str]) -> None:
+        """Serve ``targets`` from a freshly warmed process pool.
+
+        Called after a hot swap or rollback, so no request pays for loading the
+        new model in a worker. The old pool finishes its in-flight jobs and
+        exits. Thread pools score the server's own models and need nothing.
+        """
+        if self.kind != "process" or self._pool is None:
+            return
+        with self._refresh_lock:
+            start = time.perf_counter()
+            pool = self._process_pool(targets)
+            old, self._pool = self._pool, pool
+            old.shutdown(wait=False)
+            logger.info(
+                "Inference workers refreshed for %s in %.2fs",
+                targets,
+                time.perf_counter() - start,
+            )
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = self._process_pool({})
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        logger.info(
+            "Inference executor: %s x%d, queue %d, timeout %ss",
+            self.kind,
+            self.max_workers,
+            self.max_pending,
+            self.timeout,
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _release(self, _future) -> None:
+        self.pending -= 1
+        self.completed += 1
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool, bounded by ``max_pending``."""
+        if self._pool is None:
+            self.start()
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after)
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = loop.run_in_executor(self._pool, fn, *args)
+        # the slot is freed when the work really finishes, not on timeout,
+        # so abandoned jobs still count against the queue bound
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def score(
+        self,
+        loaded: LoadedModel,
+        rows,
+        engine: str,
+        timings: Optional[Dict[str, float]] = None,
+        profiles: Optional[List[Dict[Any, Any]]] = None,
+        probabilities: bool = False,
+    ):
+        """``score_rows`` for ``loaded`` on the pool; returns (labels, confidences),
+        plus a ``{class: probabilities}`` dict when ``probabilities`` is set.
+
+        ``timings``, if given, receives the preprocess / inference seconds.
+        Passing a ``profiles`` list runs the call under cProfile in the worker
+        and appends its raw stats (see ``profiler.py``).
+        """
+        profile = profiles is not None
+        if self.kind == "process":
+            result = await self.run(
+                _score_in_worker,
+                loaded.name,
+                loaded.version,
+                loaded.info.get("sha256"),
+                rows,
+                engine,
+                profile,
+                probabilities,
+            )
+        else:
+            result = await self.run(
+                _score_in_thread, loaded, rows, engine, profile, probabilities
+            )
+        scored, stages, stats = result
+        if timings is not None:
+            timings.update(stages)
+        if profile:
+            profiles.append(stats)
+        return scored
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
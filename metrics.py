@@ -0,0 +1,189 @@
+"""Minimal Prometheus-style metrics without a client library.
+
+Counters, gauges and histograms keep their series in plain dicts keyed by
+label-value tuples behind one lock each, so recording is a dict lookup and
+an add. :meth:`Registry.render` produces the text exposition format served
+by ``GET /metrics``; callables registered with :meth:`Registry.collector`
+are evaluated at scrape time for values that already live elsewhere (model
+load times, cache and executor stats).
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# seconds; fine enough below 1 ms for the per-stage timings
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return f"{name}{{{body}}} {_number(value)}"
+    return f"{name} {_number(value)}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield self.name, dict(zip(self.labels, values)), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple = (), value: float = 0.0) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, labels: tuple) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()]
+        for values, (counts, total, count) in items:
+            labels = dict(zip(self.labels, values))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(self.labels, time.perf_counter() - self.start)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # () -> iterable of (name, kind, help, [(labels, value), ...])
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[tuple]]) -> Callable:
+        self._collectors.append(fn)
+        return fn
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(_format(*sample) for sample in metric.samples())
+        for collect in self._collectors:
+            for name, kind, help, series in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(_format(name, labels, value) for labels, value in series)
+        return "\n".join(lines) + "\n"
+
+
+class ReceivedAtMiddleware:
+    """ASGI middleware stamping ``scope["received_at"]`` when a request arrives.
+
+    Endpoints subtract it from their own start time to measure the body
+    parsing and validation FastAPI does before calling them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope["received_at"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,127 @@
+"""Dynamic micro-batching of single-record predictions.
+
+Concurrent ``/health/predict`` and ``/car/predict`` calls each pay the full
+per-call overhead of the pipeline. :class:`MicroBatcher` holds requests for
+the same model version and engine for up to ``max_wait_ms`` (or until
+``max_batch_size`` are waiting), scores them in one
+:meth:`inference_executor.InferenceExecutor.score` call and fans the rows
+back to the waiting requests. A lone request therefore waits at most
+``max_wait_ms`` longer than it would unbatched.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from inference_executor import InferenceExecutor
+from model_store import LoadedModel
+
+# upper bounds of the batch-size histogram buckets
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        executor: InferenceExecutor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+    ):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        # (name, version, engine) -> [(features, future, enqueued_at, timings), ...]
+        self._queues: Dict[Tuple[str, str, str], List[tuple]] = {}
+        self._models: Dict[Tuple[str, str, str], LoadedModel] = {}
+        self._timers: Dict[Tuple[str, str, str], asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.size_histogram = {bucket: 0 for bucket in SIZE_BUCKETS}
+        self.size_histogram["+Inf"] = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def score(
+        self,
+        loaded: LoadedModel,
+        features: Mapping[str, Any],
+        engine: str,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[Any, float]:
+        """Queue one row and wait for its (label, confidence).
+
+        ``timings`` receives the row's queue wait and its batch's stage timings.
+        """
+        loop = asyncio.get_running_loop()
+        key = (loaded.name, loaded.version, engine)
+        queue = self._queues.setdefault(key, [])
+        self._models.setdefault(key, loaded)
+        future = loop.create_future()
+        queue.append((features, future, time.perf_counter(), timings))
+        if len(queue) >= self.max_batch_size:
+            self._flush(key)
+        elif len(queue) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._queues.pop(key, None)
+        loaded = self._models.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(loaded, key[2], batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loaded: LoadedModel, engine: str, batch: List[tuple]) -> None:
+        self._record(batch)
+        stages: Dict[str, float] = {}
+        try:
+            labels, probs = await self.executor.score(
+                loaded, [features for features, _, _, _ in batch], engine, stages
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            # every waiter sees the same failure (saturated, timeout, ...)
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _, timings), label, prob in zip(batch, labels, probs):
+            if timings is not None:
+                timings.update(stages)
+            if not future.done():  # the client may have gone away
+                future.set_result((label, prob))
+
+    def _record(self, batch: List[tuple]) -> None:
+        now = time.perf_counter()
+        size = len(batch)
+        self.batches += 1
+        self.items += size
+        bucket = next((b for b in SIZE_BUCKETS if size <= b), "+Inf")
+        self.size_histogram[bucket] += 1
+        for _, _, enqueued_at, timings in batch:
+            waited = now - enqueued_at
+            if timings is not None:
+                timings["queue"] = waited
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "batch_size_histogram": {str(k): v for k, v in self.size_histogram.items()},
+            "mean_queue_wait_ms": (
+                round(self.wait_total / self.items * 1000, 3) if self.items else None
+            ),
+            "max_queue_wait_ms": round(self.wait_max * 1000, 3),
+        }
@@ -0,0 +1,174 @@
+"""Versioned model registry under ``models/registry``.
+
+Layout::
+
+    models/registry/<name>/<version>/model.pkl       uncompressed joblib artifact
+    models/registry/<name>/<version>/manifest.json   hash, sklearn version, metrics, ...
+    models/registry/<name>/ACTIVE                    version served by the API
+
+    python model_registry.py list car
+    python model_registry.py register car models/car_insurance_model.pkl --activate
+    python model_registry.py activate car 20260101T000000Z-1a2b3c4d
+"""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+REGISTRY_DIR = os.path.join("models", "registry")
+ARTIFACT_NAME = "model.pkl"
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_dir(name: str, root: str = REGISTRY_DIR) -> str:
+    return os.path.join(root, name)
+
+
+def version_dir(name: str, version: str, root: str = REGISTRY_DIR) -> str:
+    return os.path.join(root, name, version)
+
+
+def artifact_path(name: str, version: str, root: str = REGISTRY_DIR) -> str:
+    return os.path.join(version_dir(name, version, root), ARTIFACT_NAME)
+
+
+def _write_json(path: str, payload) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True, default=str)
+    os.replace(tmp, path)
+
+
+def register_model(
+    name: str,
+    pipeline,
+    metrics: Optional[Dict[str, Any]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    activate: bool = False,
+    root: str = REGISTRY_DIR,
+) -> Dict[str, Any]:
+    """Save ``pipeline`` as a new version of ``name`` and return its manifest."""
+    import sklearn
+
+    from model_store import save_model
+
+    created = datetime.now(timezone.utc)
+    staging = os.path.join(_model_dir(name, root), f".staging-{os.getpid()}")
+    os.makedirs(staging, exist_ok=True)
+    staged = os.path.join(staging, ARTIFACT_NAME)
+    save_model(pipeline, staged)
+    sha = file_sha256(staged)
+
+    version = f"{created.strftime('%Y%m%dT%H%M%SZ')}-{sha[:8]}"
+    manifest = {
+        "name": name,
+        "version": version,
+        "sha256": sha,
+        "size_bytes": os.path.getsize(staged),
+        "sklearn_version": sklearn.__version__,
+        "created_at": created.isoformat(),
+        "metrics": metrics or {},
+        **(extra or {}),
+    }
+    _write_json(os.path.join(staging, MANIFEST_NAME), manifest)
+    os.replace(staging, version_dir(name, version, root))
+    if activate:
+        set_active(name, version, root)
+    return manifest
+
+
+def read_manifest(name: str, version: str, root: str = REGISTRY_DIR) -> Dict[str, Any]:
+    with open(os.path.join(version_dir(name, version, root), MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def list_versions(name: str, root: str = REGISTRY_DIR) -> List[str]:
+    """Registered versions of ``name``, oldest first."""
+    base = _model_dir(name, root)
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        v
+        for v in os.listdir(base)
+        if not v.startswith(".")
+        and os.path.isfile(os.path.join(base, v, MANIFEST_NAME))
+    )
+
+
+def active_version(name: str, root: str = REGISTRY_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(_model_dir(name, root), "ACTIVE")) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        versions = list_versions(name, root)
+        return versions[-1] if versions else None
+    return version or None
+
+
+def set_active(name: str, version: str, root: str = REGISTRY_DIR) -> None:
+    if version not in list_versions(name, root):
+        raise KeyError(f"Unknown {name} model version {version!r}")
+    path = os.path.join(_model_dir(name, root), "ACTIVE")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, path)
+
+
+def verify(name: str, version: str, root: str = REGISTRY_DIR) -> bool:
+    """True if the artifact still matches the hash recorded in its manifest."""
+    manifest = read_manifest(name, version, root)
+    return file_sha256(artifact_path(name, version, root)) == manifest["sha256"]
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Versioned model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="show versions and the active one")
+    p_list.add_argument("name")
+    p_reg = sub.add_parser("register", help="add an existing artifact as a version")
+    p_reg.add_argument("name")
+    p_reg.add_argument("path")
+    p_reg.add_argument("--activate", action="store_true")
+    p_act = sub.add_parser("activate", help="mark a version as served on next load")
+    p_act.add_argument("name")
+    p_act.add_argument("version")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        active = active_version(args.name)
+        for version in list_versions(args.name):
+            manifest = read_manifest(args.name, version)
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  {manifest['created_at']}  {manifest['metrics']}")
+    elif args.command == "register":
+        manifest = register_model(
+            args.name,
+            joblib.load(args.path),
+            extra={"source": args.path},
+            activate=args.activate,
+        )
+        print(f"Registered {args.name} {manifest['version']}")
+    else:
+        set_active(args.name, args.version)
+        print(f"{args.name} active version: {args.version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+"""Model artifact store: memory-mapped flat forests, optionally lazy loading.
+
+Unpickling a sklearn forest cannot share memory: ``Tree.__setstate__`` copies
+the node and value arrays into buffers of its own, even under
+``joblib.load(..., mmap_mode="r")``. What workers share instead is the flat
+forest export used by the ``flat`` engine. It is written once per artifact
+to ``FOREST_CACHE_DIR`` as raw ``.npy`` files, together with the fitted
+preprocessing steps, and mapped read-only on every later load. Every uvicorn
+worker and process-pool worker then reads the same physical pages.
+
+The full sklearn pipeline is only unpickled when the ``sklearn`` engine is
+actually used (``LoadedModel.pipeline``), or when the model cannot be
+flattened. A lazy load checks the file against the sha256 recorded when the
+version was loaded and fails if it changed, so the two engines of one
+``LoadedModel`` never score with different models. ``mmapped`` in
+``stats()`` reports whether the flat arrays really are memory maps.
+
+    python model_store.py convert models/car_insurance_model.pkl
+"""
+
+import hashlib
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+import model_registry
+from fast_encoder import CompiledEncoder, compile_encoder
+from flat_forest import FlatForest
+
+logger = logging.getLogger("uvicorn.error")
+
+FOREST_CACHE_DIR = os.path.join("models", ".cache")
+
+# bump when the files written by ``load_flat_forest`` change
+_FOREST_CACHE_LAYOUT = 2
+_FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+@dataclass
+class LoadedModel:
+    name: str
+    path: str
+    # fitted ``pipeline[:-1]``; with ``forest`` it is all the flat engine needs
+    preprocessor: Any
+    version: str = "legacy"
+    encoder: Optional[CompiledEncoder] = None
+    forest: Optional[FlatForest] = None
+    load_seconds: float = 0.0
+    info: Dict[str, Any] = field(default_factory=dict)
+    _pipeline: Any = field(default=None, repr=False)
+    _pipeline_lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    @property
+    def pipeline(self):
+        """The full sklearn pipeline, unpickled from ``path`` on first use.
+
+        Raises ``RuntimeError`` if the file no longer has the sha256 in
+        ``info``: it was overwritten after this version was loaded, and its
+        forest would not match ``forest``.
+        """
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None:
+                    start = time.perf_counter()
+                    self._pipeline = self._load_pipeline()
+                    logger.info(
+                        "Loaded sklearn estimator for %s model %s in %.3fs",
+                        self.name,
+                        self.version,
+                        time.perf_counter() - start,
+                    )
+        return self._pipeline
+
+    def _load_pipeline(self):
+        expected = self.info.get("sha256")
+        # hash and unpickle the same open file, so a concurrent replace can't slip in
+        with open(self.path, "rb") as f:
+            if expected:
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+                if digest.hexdigest() != expected:
+                    raise RuntimeError(
+                        f"{self.name} model {self.version}: {self.path} changed on disk "
+                        f"since it was loaded (sha256 {expected[:12]}); reload the model"
+                    )
+                f.seek(0)
+            return joblib.load(f)
+
+    @property
+    def sklearn_loaded(self) -> bool:
+        return self._pipeline is not None
+
+    @property
+    def mmapped(self) -> bool:
+        """Whether the flat forest arrays are memory maps shared between processes."""
+        return self.forest is not None and all(
+            isinstance(getattr(self.forest, key), np.memmap) for key in _FOREST_ARRAYS
+        )
+
+
+def save_model(pipeline, path: str) -> None:
+    """Write an uncompressed joblib artifact (faster to load than a compressed one)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    joblib.dump(pipeline, tmp, compress=0)
+    os.replace(tmp, path)
+
+
+def is_compressed(path: str) -> bool:
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    # zlib/gzip/bz2/xz/lz4 headers used by joblib compressors
+    return (
+        magic[:1] == b"\x78"
+        or magic[:2] == b"\x1f\x8b"
+        or magic[:3] == b"BZh"
+        or magic[:4] in (b"\xfd7zX", b"\x04\x22\x4d\x18")
+    )
+
+
+def memory_usage() -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of this process, in bytes."""
+    rss = shared = None
+    try:
+        with open("/proc/self/statm") as f:
+            fields = f.read().split()
+        page = os.sysconf("SC_PAGE_SIZE")
+        rss, shared = int(fields[1]) * page, int(fields[2]) * page
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    return {"rss_bytes": rss, "shared_bytes": shared, "peak_rss_bytes": peak}
+
+
+def _forest_cache_path(path: str) -> str:
+    st = os.stat(path)
+    key = f"{_FOREST_CACHE_LAYOUT}:{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(FOREST_CACHE_DIR, digest)
+
+
+def load_flat_forest(path: str, mmap: bool = True) -> Tuple[FlatForest, Any]:
+    """(flat forest, fitted preprocessor) for the artifact at ``path``.
+
+    The first load unpickles the pipeline, flattens its forest and writes the
+    node arrays and ``pipeline[:-1]`` to the cache. Later loads map the arrays
+    and read only the small preprocessor, never the sklearn forest.
+    """
+    cache = _forest_cache_path(path)
+    if not os.path.isdir(cache):
+        pipeline = joblib.load(path)
+        forest = FlatForest.from_estimator(pipeline)
+        os.makedirs(FOREST_CACHE_DIR, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=FOREST_CACHE_DIR)
+        for key in _FOREST_ARRAYS:
+            np.save(os.path.join(tmp, f"{key}.npy"), getattr(forest, key))
+        np.save(os.path.join(tmp, "meta.npy"), np.array([forest.max_depth]))
+        joblib.dump(
+            {"preprocessor": pipeline[:-1], "classes": forest.classes_},
+            os.path.join(tmp, "preprocessor.joblib"),
+        )
+        del pipeline, forest
+        try:
+            os.rename(tmp, cache)
+        except OSError:
+            # another worker won the race
+            shutil.rmtree(tmp, ignore_errors=True)
+    mode = "r" if mmap else None
+    arrays = {
+        key: np.load(os.path.join(cache, f"{key}.npy"), mmap_mode=mode)
+        for key in _FOREST_ARRAYS
+    }
+    max_depth = int(np.load(os.path.join(cache, "meta.npy"))[0])
+    fitted = joblib.load(os.path.join(cache, "preprocessor.joblib"))
+    forest = FlatForest(max_depth=max_depth, classes=fitted["classes"], **arrays)
+    return forest, fitted["preprocessor"]
+
+
+LEGACY_VERSION = "legacy"
+
+
+class ModelStore:
+    """Named model artifacts, loaded eagerly via :meth:`load_all` or on first use.
+
+    The served version of each model comes from the registry's ``ACTIVE``
+    pointer (see ``model_registry``); ``paths`` are the legacy single-file
+    artifacts used when a model has no registered versions. :meth:`swap`
+    loads and warms another version off the request path and then replaces
+    the served :class:`LoadedModel` in one assignment, so in-flight requests
+    keep scoring with the object they already hold.
+    """
+
+    def __init__(
+        self,
+        paths: Dict[str, str],
+        mmap: bool = True,
+        fast_encoder: bool = True,
+        registry_root: str = model_registry.REGISTRY_DIR,
+    ):
+        self.paths = dict(paths)
+        self.mmap = mmap
+        self.fast_encoder = fast_encoder
+        self.registry_root = registry_root
+        self.startup_seconds: Optional[float] = None
+        self._models: Dict[str, Optional[LoadedModel]] = {n: None for n in paths}
+        self._previous: Dict[str, Optional[LoadedModel]] = {n: None for n in paths}
+        self._errors: Dict[str, str] = {}
+        self._reloads: Dict[str, Dict[str, Any]] = {}
+        self._locks = {n: threading.Lock() for n in paths}
+        self._swap_locks = {n: threading.Lock() for n in paths}
+        # callables(name, loaded) run after the served version changes
+        self.listeners = []
+
+    def is_loaded(self, name: str) -> bool:
+        return self._models.get(name) is not None
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        loaded = self._models.get(name)
+        if loaded is None and name in self.paths and name not in self._errors:
+            loaded = self.load(name)
+        return loaded
+
+    def resolve(self, name: str, version: Optional[str] = None):
+        """(version, artifact path) to serve; ``None`` picks the active version."""
+        if version is None:
+            version = model_registry.active_version(name, self.registry_root)
+        if version is None or version == LEGACY_VERSION:
+            return LEGACY_VERSION, self.paths[name]
+        if version not in model_registry.list_versions(name, self.registry_root):
+            raise KeyError(f"Unknown {name} model version {version!r}")
+        return version, model_registry.artifact_path(name, version, self.registry_root)
+
+    def load(self, name: str) -> Optional[LoadedModel]:
+        with self._locks[name]:
+            if self._models[name] is not None:
+                return self._models[name]
+            try:
+                version, path = self.resolve(name)
+            except (KeyError, OSError) as e:
+                logger.exception("Failed to resolve %s model: %s", name, e)
+                self._errors[name] = str(e)
+                return None
+            if not os.path.exists(path):
+                logger.warning("%s model not found at %s", name.capitalize(), path)
+                self._errors[name] = "not found"
+                return None
+            try:
+                loaded = self._load_artifact(name, path, version)
+            except Exception as e:
+                logger.exception("Failed to load %s model: %s", name, e)
+                self._errors[name] = str(e)
+                return None
+            self._models[name] = loaded
+            self._errors.pop(name, None)
+            logger.info(
+                "Loaded %s model %s from %s in %.3fs (mmap=%s)",
+                name,
+                version,
+                path,
+                loaded.load_seconds,
+                loaded.mmapped,
+            )
+            return loaded
+
+    def _load_artifact(
+        self, name: str, path: str, version: str = LEGACY_VERSION
+    ) -> LoadedModel:
+        start = time.perf_counter()
+        info = {}
+        if version != LEGACY_VERSION:
+            info = model_registry.read_manifest(name, version, self.registry_root)
+        if "sha256" not in info:
+            # hashed before reading, so the forest can't come from a newer file
+            info["sha256"] = model_registry.file_sha256(path)
+        forest = preprocessor = pipeline = None
+        try:
+            forest, preprocessor = load_flat_forest(path, mmap=self.mmap)
+        except (AttributeError, NotImplementedError, OSError) as e:
+            logger.warning("Flat forest engine disabled for %s model: %s", name, e)
+        if preprocessor is None:
+            # nothing to map; the sklearn pipeline is the only engine
+            pipeline = joblib.load(path)
+            preprocessor = pipeline[:-1]
+        loaded = LoadedModel(
+            name=name,
+            path=path,
+            preprocessor=preprocessor,
+            version=version,
+            forest=forest,
+            info=info,
+            _pipeline=pipeline,
+        )
+        if self.fast_encoder:
+            try:
+                loaded.encoder = compile_encoder(preprocessor)
+            except NotImplementedError as e:
+                logger.warning("Fast encoder disabled for %s model: %s", name, e)
+        loaded.load_seconds = time.perf_counter() - start
+        return loaded
+
+    def load_all(self) -> None:
+        start = time.perf_counter()
+        for name in self.paths:
+            self.load(name)
+        self.startup_seconds = time.perf_counter() - start
+
+    # -----------------------
+    # Hot reload
+    # -----------------------
+    @staticmethod
+    def warm(loaded: LoadedModel) -> None:
+        """Score a dummy row so mapped pages and lazy sklearn state are touched.
+
+        The sklearn estimator is only warmed if it is already loaded; warming
+        must not unpickle it.
+        """
+        if loaded.forest is not None:
+            loaded.forest.predict_proba(np.zeros((1, int(loaded.forest.feature.max()) + 1)))
+        if loaded.sklearn_loaded:
+            estimator = loaded.pipeline[-1]
+            estimator.predict_proba(np.zeros((1, estimator.n_features_in_)))
+
+    def swap(
+        self, name: str, version: Optional[str] = None, activate: bool = True
+    ) -> LoadedModel:
+        """Load, warm and atomically serve ``version`` (default: active).
+
+        ``activate`` also moves the registry's ACTIVE pointer so restarts
+        keep serving the new version.
+        """
+        with self._swap_locks[name]:
+            self._reloads[name] = {"state": "loading", "version": version}
+            try:
+                version, path = self.resolve(name, version)
+                loaded = self._load_artifact(name, path, version)
+                self.warm(loaded)
+            except Exception as e:
+                self._reloads[name] = {
+                    "state": "failed",
+                    "version": version,
+                    "error": str(e),
+                }
+                raise
+            if activate and version != LEGACY_VERSION:
+                model_registry.set_active(name, version, self.registry_root)
+            with self._locks[name]:
+                self._previous[name] = self._models[name]
+                self._models[name] = loaded
+                self._errors.pop(name, None)
+            self._reloads[name] = {"state": "ready", "version": version}
+            logger.info("Swapped %s model to version %s", name, version)
+            self._notify(name, loaded)
+            return loaded
+
+    def rollback(self, name: str) -> LoadedModel:
+        """Serve the previously loaded version again (no reload needed)."""
+        with self._swap_locks[name]:
+            with self._locks[name]:
+                previous = self._previous[name]
+                if previous is None:
+                    raise LookupError(f"No previous {name} model to roll back to")
+                self._previous[name] = self._models[name]
+                self._models[name] = previous
+            if previous.version != LEGACY_VERSION:
+                model_registry.set_active(name, previous.version, self.registry_root)
+            self._reloads[name] = {"state": "rolled_back", "version": previous.version}
+            logger.info("Rolled %s model back to version %s", name, previous.version)
+            self._notify(name, previous)
+            return previous
+
+    def _notify(self, name: str, loaded: LoadedModel) -> None:
+        for listener in self.listeners:
+            try:
+                listener(name, loaded)
+            except Exception:
+                logger.exception("Model swap listener failed for %s", name)
+
+    def versions(self, name: str) -> Dict[str, Any]:
+        current = self._models[name]
+        previous = self._previous[name]
+        return {
+            "serving": current.version if current else None,
+            "previous": previous.version if previous else None,
+            "active": model_registry.active_version(name, self.registry_root),
+            "available": model_registry.list_versions(name, self.registry_root),
+            "reload": self._reloads.get(name),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for name in self.paths:
+            loaded = self._models[name]
+            path = loaded.path if loaded else self.paths[name]
+            models[name] = {
+                "path": path,
+                "version": loaded.version if loaded else None,
+                "loaded": loaded is not None,
+                "error": self._errors.get(name),
+                "load_seconds": round(loaded.load_seconds, 4) if loaded else None,
+                "mmapped": loaded.mmapped if loaded else None,
+                "sklearn_loaded": loaded.sklearn_loaded if loaded else None,
+                "size_bytes": os.path.getsize(path) if os.path.exists(path) else None,
+            }
+        return {
+            "startup_seconds": (
+                round(self.startup_seconds, 4)
+                if self.startup_seconds is not None
+                else None
+            ),
+            "models": models,
+            "memory": memory_usage(),
+        }
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Model artifact utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="re-save artifacts uncompressed (faster loads)")
+    convert.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        if not is_compressed(path):
+            print(f"{path}: already uncompressed")
+            continue
+        save_model(joblib.load(path), path)
+        print(f"{path}: rewritten uncompressed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
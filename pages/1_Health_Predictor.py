@@ -3,6 +3,9 @@ import streamlit as st
 import requests
 from typing import Dict
 
+from api_client import get_client, show_latency
+from what_if import show_sweep
+
 # Page config & header styling
 st.set_page_config(
     page_title="Insurance Premium Predictor",
@@ -42,7 +45,8 @@ st.markdown(
 )
 st.write("Enter your details below. The model runs on a FastAPI backend")
 
-API_URL = "http://127.0.0.1:8000/health/predict"
+API_PATH = "/health/predict"
+client = get_client()
 
 
 preset = st.selectbox(
@@ -167,7 +171,7 @@ if submit:
     else:
         with st.spinner("Contacting model server..."):
             try:
-                r = requests.post(API_URL, json=payload, timeout=8)
+                r = client.post(API_PATH, payload)
             except requests.exceptions.ConnectionError:
                 st.error(
                     "❌ Could not connect to FastAPI. Is it running? Start it with `uvicorn app:app --reload`."
@@ -180,9 +184,8 @@ if submit:
                 st.stop()
 
         if r.status_code == 200:
-            try:
-                data = r.json()
-            except Exception:
+            data = r.data
+            if data is None:
                 st.error("Invalid JSON response from server.")
                 st.stop()
 
@@ -207,9 +210,8 @@ if submit:
                 )
 
         else:
-            try:
-                err = r.json()
-            except Exception:
+            err = r.data
+            if err is None:
                 st.error(f"Server error ({r.status_code}).")
                 st.write(r.text)
             else:
@@ -219,3 +221,22 @@ if submit:
                     st.write(err["detail"])
                 else:
                     st.write(err)
+
+        show_latency(client, r, API_PATH)
+
+# numeric ranges cover the training data (height in feet); smoker and
+# occupation are swept over all their values, city over one city per tier
+show_sweep(
+    "health_sweep",
+    "/health/sweep",
+    build_payload(),
+    {
+        "age": ("Age", 18, 75),
+        "weight": ("Weight (kg)", 45.0, 125.0),
+        "height": ("Height (feet)", 4.9, 6.3),
+        "income_lpa": ("Annual income (LPA)", 0.5, 50.0),
+        "smoker": ("Smoker?", None, None),
+        "occupation": ("Occupation", None, None),
+        "city": ("City", None, None),
+    },
+)
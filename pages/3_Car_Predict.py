@@ -2,6 +2,9 @@ import streamlit as st
 import requests
 from typing import Dict
 
+from api_client import get_client, show_latency
+from what_if import show_sweep
+
 st.set_page_config(
     page_title="Car Insurance Category Predict", page_icon="🚗", layout="centered"
 )
@@ -48,18 +51,19 @@ def build_payload() -> Dict:
     }
 
 
-API_URL = "http://127.0.0.1:8000/car/predict"
+API_PATH = "/car/predict"
+client = get_client()
 if submit:
     payload = build_payload()
     st.write("Sending payload to API:")
     st.json(payload)
 
-    if API_URL.strip() == "":
-        st.error("Set the API URL first.")
+    if not client.base_url:
+        st.error("Set API_BASE_URL first.")
     else:
         with st.spinner("Contacting prediction server..."):
             try:
-                res = requests.post(API_URL, json=payload, timeout=8)
+                res = client.post(API_PATH, payload)
             except requests.exceptions.ConnectionError:
                 st.error("Could not connect to FastAPI. Is it running?")
                 st.stop()
@@ -69,12 +73,9 @@ if submit:
 
         if res.status_code != 200:
             st.error(f"Server returned {res.status_code}")
-            try:
-                st.write(res.json())
-            except Exception:
-                st.write(res.text)
+            st.write(res.data if res.data is not None else res.text)
         else:
-            data = res.json()
+            data = res.data
             pred = data.get("predicted_category")
             conf = data.get("confidence")
             if pred is None:
@@ -90,3 +91,20 @@ if submit:
                     "High": "High risk, higher premium likely.",
                 }
                 st.write(advice.get(pred, "Interpret result carefully."))
+
+        show_latency(client, res, API_PATH)
+
+# ranges cover the training data
+show_sweep(
+    "car_sweep",
+    "/car/sweep",
+    build_payload(),
+    {
+        "driver_age": ("Driver Age (years)", 18, 65),
+        "driver_experience": ("Driver Experience (years)", 0, 40),
+        "previous_accidents": ("Previous Accidents (count)", 0, 5),
+        "annual_mileage_x1000": ("Annual Mileage (x1000 km)", 10.0, 25.0),
+        "car_manufacturing_year": ("Car Manufacturing Year", 1990, 2025),
+        "car_age": ("Car Age (years)", 0, 35),
+    },
+)
@@ -0,0 +1,111 @@
+"""Bounded LRU + TTL cache of predictions keyed on engineered features.
+
+Keys are ``(model name, artifact sha256, canonical feature tuple)``. A
+legacy reload keeps the version label ``"legacy"``, so the label cannot tell
+models apart: a request still in flight during a swap would ``put`` the old
+model's answer after :meth:`PredictionCache.invalidate` ran, under a key the
+new model then hits. Keyed on the artifact hash, that entry is simply never
+looked up again. Float features
+can be quantised per column (e.g. ``bmi`` to 0.1) to raise the hit rate at
+the cost of answering with the first prediction seen in each bucket.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Optional
+
+
+def parse_quantize(spec: str) -> Dict[str, float]:
+    """Parse ``"bmi=0.1,income_lpa=0.01"`` into ``{"bmi": 0.1, ...}``."""
+    steps = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        column, _, step = item.partition("=")
+        steps[column.strip()] = float(step)
+    return steps
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: Optional[float] = 300.0,
+        quantize: Optional[Dict[str, float]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.quantize = quantize or {}
+        # key -> (stored at, prediction)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def key(self, name: str, artifact: str, features: Mapping[str, Any]) -> Hashable:
+        """Cache key; ``artifact`` identifies the exact model file (its sha256)."""
+        items = []
+        for column in sorted(features):
+            value = features[column]
+            step = self.quantize.get(column)
+            if step and isinstance(value, float):
+                value = round(value / step)
+            items.append((column, value))
+        return name, artifact, tuple(items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Drop every entry (or only those of model ``name``); returns the count."""
+        with self._lock:
+            if name is None:
+                dropped = len(self._data)
+                self._data.clear()
+                return dropped
+            stale = [k for k in self._data if k[0] == name]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,163 @@
+"""Opt-in cProfile capture of prediction requests.
+
+A request is profiled when profiling has been switched on through the admin
+endpoint, or when it falls in the ``PROFILE_SAMPLE_RATE`` sample. Two
+profiles are taken and merged into one ``.prof`` file:
+
+* the request handler on the event loop thread (validation, features,
+  serialization). Coroutines interleaved with it while it awaits show up too,
+  so at most one request is profiled on the loop at a time;
+* the scoring call (encoder/preprocessor + forest) on the executor worker
+  (thread or process). The worker returns its raw stats with the result.
+
+Files are standard ``pstats`` dumps that flamegraph tools read directly
+(``flameprof``, ``snakeviz``, ``gprof2dot``). Only the newest ``max_files``
+are kept. When profiling is off, the per-request cost is one attribute check.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("uvicorn.error")
+
+PROFILE_SUFFIX = ".prof"
+_SAFE_NAME = re.compile(r"^[\w.-]+\.prof$")
+
+
+class _CollectedStats:
+    """Adapter so ``pstats.Stats.add`` accepts stats dicts sent back by workers."""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def profile_call(fn, *args, **kwargs):
+    """Run ``fn`` under cProfile; returns (result, raw stats dict or ``None``)."""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ profiles every thread from one tool; the request's
+        # profiler on the loop already sees this call
+        return fn(*args, **kwargs), None
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, profile.stats
+
+
+class RequestProfiler:
+    def __init__(self, directory: str = "profiles", sample_rate: float = 0.0, max_files: int = 50):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.enabled = False
+        self.captured = 0
+        self.skipped = 0
+        self._busy = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or self.sample_rate > 0
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+    def begin(self) -> Optional[cProfile.Profile]:
+        """Start profiling this request if it is selected; ``None`` otherwise."""
+        if not self.enabled and random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            # another request already owns the loop's profiler
+            self.skipped += 1
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # some other profiler (a debugger, py-spy in-process, ...) is active
+            self._busy.release()
+            self.skipped += 1
+            return None
+        return profile
+
+    def finish(
+        self, profile: cProfile.Profile, label: str, worker_stats: List[Dict[Any, Any]] = ()
+    ) -> Optional[str]:
+        """Stop ``profile``, merge the worker stats and write the ``.prof`` file."""
+        profile.disable()
+        self._busy.release()
+        try:
+            stats = pstats.Stats(profile)
+            for raw in worker_stats:
+                if raw:
+                    stats.add(_CollectedStats(raw))
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-{label}"
+            path = os.path.join(self.directory, name + PROFILE_SUFFIX)
+            stats.dump_stats(path)
+            self.captured += 1
+            self._rotate()
+            return path
+        except Exception as e:
+            logger.exception("Failed to write profile: %s", e)
+            return None
+
+    def _rotate(self) -> None:
+        for entry in self.list()[self.max_files :]:
+            try:
+                os.remove(os.path.join(self.directory, entry["name"]))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Saved profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(PROFILE_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append(
+                {"name": name, "size_bytes": stat.st_size, "created": stat.st_mtime}
+            )
+        return sorted(entries, key=lambda e: e["created"], reverse=True)
+
+    def path(self, name: str) -> str:
+        """Path of a saved profile; ``KeyError`` if it does not exist."""
+        path = os.path.join(self.directory, name)
+        if not _SAFE_NAME.match(name) or not os.path.isfile(path):
+            raise KeyError(f"Unknown profile {name!r}")
+        return path
+
+    def summary(self, name: str, sort: str = "cumulative", limit: int = 40) -> str:
+        out = io.StringIO()
+        pstats.Stats(self.path(name), stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "directory": self.directory,
+            "max_files": self.max_files,
+            "captured": self.captured,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,155 @@
+"""What-if sweep chart for the predictor pages.
+
+Scores the applicant on the form over a grid of one or two varied fields in
+one ``/health/sweep`` or ``/car/sweep`` call and draws the predicted
+category with its confidence:
+
+* one field: each category's probability along the field;
+* two fields: a category map, fainter where the model is less sure.
+
+    show_sweep("car_sweep", "/car/sweep", build_payload(), {
+        "driver_age": ("Driver Age", 16, 80),
+        ...
+    })
+
+Fields given without a range (bools, fixed choices) are swept over all
+their values by the API; ``city`` over one city per tier.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import requests
+import streamlit as st
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+from api_client import get_client, show_latency
+
+CATEGORY_COLORS = {"Low": "#22c55e", "Medium": "#f59e0b", "High": "#ef4444"}
+FIG_SIZE = (6, 3.5)
+MAX_TICKS = 10
+
+# field -> (label, start, stop); start/stop are None for non-numeric fields
+SweepFields = Dict[str, Tuple[str, Optional[float], Optional[float]]]
+
+
+def _axis(field: str, fields: SweepFields, steps: int) -> Dict[str, Any]:
+    _, start, stop = fields[field]
+    if start is None:
+        return {"field": field}
+    return {"field": field, "start": start, "stop": stop, "steps": steps}
+
+
+def _legend(ax, categories) -> None:
+    present = [c for c in CATEGORY_COLORS if c in categories]
+    ax.legend(
+        handles=[Patch(color=CATEGORY_COLORS[c], label=c) for c in present],
+        title="Category",
+        fontsize="small",
+    )
+
+
+def _ticks(values) -> Tuple[np.ndarray, list]:
+    positions = np.unique(np.linspace(0, len(values) - 1, min(len(values), MAX_TICKS)).astype(int))
+    return positions, [_format(values[i]) for i in positions]
+
+
+def _format(value) -> str:
+    return f"{value:.3g}" if isinstance(value, float) else str(value)
+
+
+def plot_sweep(result: Dict[str, Any], fields: SweepFields) -> Figure:
+    """Chart of a sweep response on a standalone ``Figure``."""
+    fig = Figure(figsize=FIG_SIZE)
+    ax = fig.subplots()
+    axes = result["axes"]
+    categories = np.asarray(result["predicted_category"], dtype=object)
+    confidence = np.asarray(result["confidence"], dtype=object)
+    scored = categories != None  # noqa: E711 - elementwise check of an object array
+    x = axes[0]["values"]
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in x)
+    positions = np.asarray(x, dtype=float) if numeric else np.arange(len(x))
+
+    if len(axes) == 1:
+        bottom = np.zeros(len(x))
+        order = list(CATEGORY_COLORS)
+        for category in sorted(
+            result["probabilities"], key=lambda c: order.index(c) if c in order else len(order)
+        ):
+            p = np.asarray(result["probabilities"][category], dtype=object)
+            y = np.where(scored, p, np.nan).astype(float)
+            color = CATEGORY_COLORS.get(category, "#9ca3af")
+            if numeric:
+                ax.plot(positions, y, color=color, marker="o", markersize=3)
+            else:
+                # stacked: each bar splits 1 between the categories
+                y = np.nan_to_num(y)
+                ax.bar(positions, y, bottom=bottom, color=color)
+                bottom += y
+        if not numeric:
+            ax.set_xticks(positions, [_format(v) for v in x], rotation=30, ha="right")
+        ax.set_ylim(0, 1.05)
+        ax.set_ylabel("Probability")
+        _legend(ax, set(result["probabilities"]))
+    else:
+        y = axes[1]["values"]
+        rgba = np.zeros(categories.shape + (4,))
+        for category, color in CATEGORY_COLORS.items():
+            mask = categories == category
+            rgba[mask, :3] = to_rgb(color)
+        # fully opaque only where the model is sure
+        rgba[..., 3] = np.where(scored, confidence, 0).astype(float) * 0.8 + 0.2 * scored
+        # rows of the image run along the second field
+        ax.imshow(rgba.transpose(1, 0, 2), origin="lower", aspect="auto", interpolation="nearest")
+        ax.set_xticks(*_ticks(x))
+        ax.set_yticks(*_ticks(y))
+        ax.set_ylabel(fields[axes[1]["field"]][0])
+        _legend(ax, set(categories[scored]))
+    ax.set_xlabel(fields[axes[0]["field"]][0])
+    fig.tight_layout()
+    return fig
+
+
+def show_sweep(key: str, path: str, base: Dict[str, Any], fields: SweepFields) -> None:
+    """Sweep form and chart around the ``base`` payload from the page's form."""
+    client = get_client()
+    names = list(fields)
+    with st.form(key):
+        st.subheader("🔁 What-if sweep")
+        c1, c2 = st.columns(2)
+        with c1:
+            first = st.selectbox("Vary", names, format_func=lambda f: fields[f][0])
+        with c2:
+            second = st.selectbox(
+                "and (optional)",
+                [None] + names,
+                format_func=lambda f: "—" if f is None else fields[f][0],
+            )
+        steps = st.slider("Points per numeric field", min_value=3, max_value=50, value=20)
+        run = st.form_submit_button("Run sweep")
+    if not run:
+        return
+    if second == first:
+        st.error("Pick two different fields.")
+        return
+
+    vary = [_axis(first, fields, steps)] + ([_axis(second, fields, steps)] if second else [])
+    with st.spinner("Scoring the grid..."):
+        try:
+            res = client.post(path, {"base": base, "vary": vary})
+        except requests.exceptions.ConnectionError:
+            st.error("Could not connect to FastAPI. Is it running?")
+            return
+        except requests.exceptions.Timeout:
+            st.error("Request timed out.")
+            return
+    if res.status_code != 200 or res.data is None:
+        st.error(f"Server returned {res.status_code}")
+        st.write(res.data if res.data is not None else res.text)
+    else:
+        st.pyplot(plot_sweep(res.data, fields))
+        if res.data["failed"]:
+            st.caption(f"{res.data['failed']} grid points failed input validation.")
+    show_latency(client, res, path)